@@ -0,0 +1,253 @@
+import os
+import random
+import time
+from typing import Any, Callable, Optional
+
+import orjson
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from opentelemetry.exporter.otlp.proto.http import Compression
+
+
+# Settings, payload helpers and the agent's span tree, with no import-time
+# side effects: client.py installs the tracer provider and exit hooks,
+# ingest_loadgen.py builds its own provider from the same settings.
+
+# ============================================================
+# OTLP exporter config
+# ============================================================
+
+# Standard OTel variable names, so the usual overrides keep working
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", "http://localhost:4318/v1/traces")
+OTLP_COMPRESSION = Compression(os.getenv("OTEL_EXPORTER_OTLP_COMPRESSION", "gzip"))
+OTLP_TIMEOUT_SECONDS = float(os.getenv("OTEL_EXPORTER_OTLP_TIMEOUT", "10"))
+
+# A deeper queue than the SDK default (2048) absorbs agent bursts without
+# dropping spans, and a longer delay (SDK: 5 s) lets slower agents fill
+# fewer, larger batches; client.shutdown_tracing flushes the rest.
+#
+# The batch size is bounded by the ingest service, which rejects requests
+# over 10 MB. A span carries at most three payloads capped at
+# SPAN_PAYLOAD_MAX_BYTES (query, inputs, outputs), about 48 KB, so 512
+# fully capped spans are ~25 MB raw and 5-12 MB gzipped depending on how
+# repetitive the text is. 512 leaves typical batches well under the limit;
+# larger ones would exceed it whenever payloads run near the cap.
+BSP_MAX_QUEUE_SIZE = int(os.getenv("OTEL_BSP_MAX_QUEUE_SIZE", "16384"))
+BSP_MAX_EXPORT_BATCH_SIZE = int(os.getenv("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "512"))
+BSP_SCHEDULE_DELAY_MILLIS = float(os.getenv("OTEL_BSP_SCHEDULE_DELAY", "10000"))
+BSP_EXPORT_TIMEOUT_MILLIS = float(os.getenv("OTEL_BSP_EXPORT_TIMEOUT", "30000"))
+
+SHUTDOWN_TIMEOUT_MILLIS = int(os.getenv("OTEL_SHUTDOWN_TIMEOUT", "30000"))
+
+if BSP_MAX_EXPORT_BATCH_SIZE > BSP_MAX_QUEUE_SIZE:
+    raise ValueError("OTEL_BSP_MAX_EXPORT_BATCH_SIZE must not exceed OTEL_BSP_MAX_QUEUE_SIZE")
+
+
+# ============================================================
+# Span payloads
+# ============================================================
+
+# Upper bound in UTF-8 bytes for one mlflow.spanInputs / spanOutputs value
+# and for user.query, so a few large agent payloads cannot push an export
+# batch past the ingest service's request limit
+SPAN_PAYLOAD_MAX_BYTES = int(os.getenv("SPAN_PAYLOAD_MAX_BYTES", "16384"))
+
+# Room for the truncation marker
+MIN_SPAN_PAYLOAD_BYTES = 64
+
+if SPAN_PAYLOAD_MAX_BYTES < MIN_SPAN_PAYLOAD_BYTES:
+    raise ValueError(f"SPAN_PAYLOAD_MAX_BYTES must be at least {MIN_SPAN_PAYLOAD_BYTES}")
+
+
+def _truncation_marker(total_bytes: int, kept_bytes: int) -> str:
+    return f"... [{total_bytes - kept_bytes} bytes truncated]"
+
+
+def truncate_text(text: str, max_bytes: int = SPAN_PAYLOAD_MAX_BYTES) -> str:
+    """
+    text, or its head plus a truncation marker, in at most max_bytes of
+    UTF-8.
+    """
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    # The marker is at most as long as for kept_bytes=0
+    budget = max_bytes - len(_truncation_marker(len(encoded), 0))
+    head = encoded[:budget].decode("utf-8", errors="ignore")
+    return head + _truncation_marker(len(encoded), len(head.encode("utf-8")))
+
+
+def encode_payload(value: Any, max_bytes: int = SPAN_PAYLOAD_MAX_BYTES) -> str:
+    """
+    Compact JSON of at most max_bytes. A larger payload is replaced by a
+    JSON string holding the head of its encoding plus a truncation marker,
+    so the attribute still parses as JSON.
+    """
+    encoded = orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    if len(encoded) <= max_bytes:
+        return encoded.decode("utf-8")
+
+    # Re-encoding as a string escapes quotes, backslashes and control
+    # characters, so search for the longest head that still fits
+    text = encoded.decode("utf-8")
+
+    def wrap(n_chars: int) -> bytes:
+        head = text[:n_chars]
+        return orjson.dumps(head + _truncation_marker(len(encoded), len(head.encode("utf-8"))))
+
+    lo, hi = 0, min(len(text), max_bytes)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if len(wrap(mid)) <= max_bytes:
+            lo = mid
+        else:
+            hi = mid - 1
+    return wrap(lo).decode("utf-8")
+
+
+def set_payload(span: trace.Span, key: str, value: Any) -> None:
+    """
+    Set a JSON payload attribute. Nothing is encoded for spans that are
+    not recording, e.g. when sampled out.
+    """
+    if span.is_recording():
+        span.set_attribute(key, encode_payload(value))
+
+
+def set_text(span: trace.Span, key: str, text: str) -> None:
+    """
+    Set a free-text attribute capped at SPAN_PAYLOAD_MAX_BYTES.
+    """
+    if span.is_recording():
+        span.set_attribute(key, truncate_text(text))
+
+
+# ============================================================
+# Fake agent pieces
+# ============================================================
+
+def fake_planner(user_query: str) -> dict[str, Any]:
+    time.sleep(0.15)
+    return {
+        "goal": "answer user question",
+        "steps": [
+            "understand request",
+            "call weather tool",
+            "summarize result",
+        ],
+        "query": user_query,
+    }
+
+
+def fake_weather_tool(city: str) -> dict[str, Any]:
+    time.sleep(0.25)
+    return {
+        "city": city,
+        "forecast": "sunny",
+        "temperature_f": random.choice([68, 70, 72, 74]),
+    }
+
+
+def fake_model_response(plan: dict[str, Any], tool_result: dict[str, Any]) -> str:
+    time.sleep(0.30)
+    return (
+        f"The weather in {tool_result['city']} looks {tool_result['forecast']} "
+        f"at about {tool_result['temperature_f']}°F. "
+        f"Plan steps were: {', '.join(plan['steps'])}."
+    )
+
+
+# ============================================================
+# Agent execution
+# ============================================================
+
+def run_agent(
+    user_query: str,
+    city: str,
+    *,
+    planner: Callable[[str], dict[str, Any]] = fake_planner,
+    weather_tool: Callable[[str], dict[str, Any]] = fake_weather_tool,
+    generate: Callable[[dict[str, Any], dict[str, Any]], str] = fake_model_response,
+    agent_tracer: Optional[trace.Tracer] = None,
+) -> str:
+    """
+    One AGENT trace with CHAIN, TOOL and LLM children. The agent pieces and
+    the tracer can be swapped, e.g. for sleep-free load generation; by
+    default spans go to the globally installed tracer provider.
+    """
+    active_tracer = agent_tracer or trace.get_tracer("demo.agent")
+    with active_tracer.start_as_current_span("agent.run", kind=SpanKind.INTERNAL) as root:
+        root.set_attribute("mlflow.spanType", "AGENT")
+        root.set_attribute("agent.name", "demo-weather-agent")
+        root.set_attribute("agent.framework", "custom")
+        set_text(root, "user.query", user_query)
+        set_payload(
+            root,
+            "mlflow.spanInputs",
+            {
+                "messages": [
+                    {"role": "user", "content": user_query},
+                ],
+                "city": city,
+            },
+        )
+
+        try:
+            with active_tracer.start_as_current_span("agent.plan", kind=SpanKind.INTERNAL) as plan_span:
+                plan_span.set_attribute("mlflow.spanType", "CHAIN")
+                plan_span.set_attribute("planner.name", "fake_planner")
+
+                plan = planner(user_query)
+
+                plan_span.set_attribute("planner.step_count", len(plan["steps"]))
+                plan_span.add_event(
+                    "planning.complete",
+                    {"goal": plan["goal"]},
+                )
+
+            with active_tracer.start_as_current_span("tool.weather_lookup", kind=SpanKind.CLIENT) as tool_span:
+                tool_span.set_attribute("mlflow.spanType", "TOOL")
+                tool_span.set_attribute("tool.name", "weather_lookup")
+                tool_span.set_attribute("tool.city", city)
+                set_payload(tool_span, "mlflow.spanInputs", {"city": city})
+
+                tool_result = weather_tool(city)
+
+                set_payload(tool_span, "mlflow.spanOutputs", tool_result)
+                tool_span.add_event(
+                    "tool.result.received",
+                    {
+                        "city": tool_result["city"],
+                        "forecast": tool_result["forecast"],
+                    },
+                )
+
+            with active_tracer.start_as_current_span("model.generate", kind=SpanKind.CLIENT) as llm_span:
+                llm_span.set_attribute("mlflow.spanType", "LLM")
+                llm_span.set_attribute("model.provider", "fake")
+                llm_span.set_attribute("model.name", "demo-model-v1")
+                set_payload(
+                    llm_span,
+                    "mlflow.spanInputs",
+                    {
+                        "plan": plan,
+                        "tool_result": tool_result,
+                    },
+                )
+
+                answer = generate(plan, tool_result)
+
+                set_payload(llm_span, "mlflow.spanOutputs", {"answer": answer})
+                llm_span.add_event(
+                    "generation.complete",
+                    {"output_length": len(answer)},
+                )
+
+            set_payload(root, "mlflow.spanOutputs", {"final_answer": answer})
+            root.set_status(Status(StatusCode.OK))
+            return answer
+
+        except Exception as exc:
+            root.record_exception(exc)
+            root.set_status(Status(StatusCode.ERROR, str(exc)))
+            raise
@@ -0,0 +1,145 @@
+import atexit
+import heapq
+import os
+import queue
+import shutil
+import tarfile
+import tempfile
+import threading
+import warnings
+from typing import Any, Dict, Optional
+
+import mlflow.sklearn
+from mlflow.tracking import MlflowClient
+
+
+class TopKGate:
+    """
+    Admits a score when it ranks among the k best seen so far. Models that
+    fall out of the top k later are not retracted.
+    """
+
+    def __init__(self, k: Optional[int], higher_is_better: bool = True):
+        self.k = k
+        self.higher_is_better = higher_is_better
+        self._best: list[float] = []
+
+    def observe(self, score: float) -> bool:
+        if self.k is None:
+            return True
+        if self.k <= 0:
+            return False
+        key = score if self.higher_is_better else -score
+        if len(self._best) < self.k:
+            heapq.heappush(self._best, key)
+            return True
+        if key > self._best[0]:
+            heapq.heapreplace(self._best, key)
+            return True
+        return False
+
+
+class BackgroundModelUploader:
+    """
+    Logs sklearn models to their runs with mlflow.sklearn.log_model on a
+    writer thread, so each one is registered as a LoggedModel of its run.
+
+    submit() returns immediately unless max_pending models are already
+    waiting, which bounds the memory held by queued models. With
+    compress=True each saved model directory is uploaded as a single
+    <artifact_path>.tar.gz run artifact instead: one smaller upload per
+    model, but plain files that MLflow does not register as a model.
+
+    A failed upload does not stop the others: it is recorded in failures,
+    tagged on its run as sweep.model_upload_error and reported with a
+    RuntimeWarning. close() waits for the queue; it also runs at
+    interpreter exit while uploads are in flight.
+    """
+
+    def __init__(
+        self,
+        client: Optional[MlflowClient] = None,
+        max_pending: int = 4,
+        compress: bool = False,
+    ):
+        self._client = client
+        self.compress = compress
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.uploaded = 0
+        # run_id -> error message of each failed upload
+        self.failures: Dict[str, str] = {}
+        # Archive bytes, compressed uploads only
+        self.bytes_uploaded = 0
+
+    @property
+    def client(self) -> MlflowClient:
+        if self._client is None:
+            self._client = MlflowClient()
+        return self._client
+
+    def submit(self, run_id: str, model: Any, artifact_path: str = "model") -> None:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._drain, name="model-uploader", daemon=True)
+                self._worker.start()
+                atexit.register(self.close)
+        self.submitted += 1
+        self._queue.put((run_id, model, artifact_path))
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                try:
+                    self._upload(*item)
+                except Exception as exc:
+                    self._record_failure(item[0], exc)
+            finally:
+                self._queue.task_done()
+
+    def _upload(self, run_id: str, model: Any, artifact_path: str) -> None:
+        if self.compress:
+            logged = self._upload_archive(run_id, model, artifact_path)
+        else:
+            logged = mlflow.sklearn.log_model(model, name=artifact_path, run_id=run_id).model_uri
+        self.client.set_tag(run_id, "sweep.model_artifact", logged)
+        self.uploaded += 1
+
+    def _record_failure(self, run_id: str, exc: Exception) -> None:
+        message = f"{type(exc).__name__}: {exc}"
+        self.failures[run_id] = message
+        warnings.warn(f"Model upload for run {run_id} failed: {message}", RuntimeWarning)
+        try:
+            self.client.set_tag(run_id, "sweep.model_upload_error", message[:1000])
+        except Exception:
+            # Best effort: the tracking server may be what failed
+            pass
+
+    def _upload_archive(self, run_id: str, model: Any, artifact_path: str) -> str:
+        tmp_dir = tempfile.mkdtemp(prefix="model-upload-")
+        try:
+            model_dir = os.path.join(tmp_dir, artifact_path)
+            mlflow.sklearn.save_model(model, model_dir)
+            archive = os.path.join(tmp_dir, f"{artifact_path}.tar.gz")
+            with tarfile.open(archive, "w:gz") as tar:
+                tar.add(model_dir, arcname=artifact_path)
+            self.client.log_artifact(run_id, archive)
+            self.bytes_uploaded += os.path.getsize(archive)
+            return f"{artifact_path}.tar.gz"
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def close(self) -> None:
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            self._queue.put(None)
+            worker.join()
+        self._worker = None
+        atexit.unregister(self.close)
@@ -1,30 +1,44 @@
-import json
-import random
-import time
-from typing import Any
+import atexit
+import os
 
 from opentelemetry import trace
-from opentelemetry.trace import SpanKind, Status, StatusCode
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 
-
-def j(value: Any) -> str:
-    return json.dumps(value, separators=(",", ":"))
+from agent_telemetry import (
+    BSP_EXPORT_TIMEOUT_MILLIS,
+    BSP_MAX_EXPORT_BATCH_SIZE,
+    BSP_MAX_QUEUE_SIZE,
+    BSP_SCHEDULE_DELAY_MILLIS,
+    OTLP_COMPRESSION,
+    OTLP_ENDPOINT,
+    OTLP_TIMEOUT_SECONDS,
+    SHUTDOWN_TIMEOUT_MILLIS,
+    run_agent,
+)
+from tail_sampling import TailSamplingProcessor
 
 
 # ============================================================
-# OTLP exporter config
+# Tracer provider
 # ============================================================
 
+# Tail sampling: error and slow traces are always exported, the rest at
+# this ratio. 1.0 exports everything without buffering.
+TAIL_KEEP_RATIO = float(os.getenv("TRACE_TAIL_KEEP_RATIO", "1.0"))
+TAIL_LATENCY_THRESHOLD_MS = float(os.getenv("TRACE_TAIL_LATENCY_MS", "1000"))
+TAIL_MAX_BUFFERED_SPANS = int(os.getenv("TRACE_TAIL_MAX_BUFFERED_SPANS", "100000"))
+
 exporter = OTLPSpanExporter(
-    endpoint="http://localhost:4318/v1/traces",
+    endpoint=OTLP_ENDPOINT,
     headers={
         "x-project-name": "demo-agent-project",
         "x-ingest-key": "super-secret",
     },
+    timeout=OTLP_TIMEOUT_SECONDS,
+    compression=OTLP_COMPRESSION,
 )
 
 provider = TracerProvider(
@@ -34,143 +48,47 @@ provider = TracerProvider(
             "service.version": "1.0.0",
             "deployment.environment": "local",
         }
-    )
+    ),
+    # Exit is handled by shutdown_tracing below
+    shutdown_on_exit=False,
 )
 
-provider.add_span_processor(BatchSpanProcessor(exporter))
+span_processor = BatchSpanProcessor(
+    exporter,
+    max_queue_size=BSP_MAX_QUEUE_SIZE,
+    schedule_delay_millis=BSP_SCHEDULE_DELAY_MILLIS,
+    max_export_batch_size=BSP_MAX_EXPORT_BATCH_SIZE,
+    export_timeout_millis=BSP_EXPORT_TIMEOUT_MILLIS,
+)
+if TAIL_KEEP_RATIO < 1.0:
+    span_processor = TailSamplingProcessor(
+        span_processor,
+        keep_ratio=TAIL_KEEP_RATIO,
+        latency_threshold_ms=TAIL_LATENCY_THRESHOLD_MS,
+        max_buffered_spans=TAIL_MAX_BUFFERED_SPANS,
+    )
+provider.add_span_processor(span_processor)
 trace.set_tracer_provider(provider)
 tracer = trace.get_tracer("demo.agent")
 
+_shut_down = False
 
-# ============================================================
-# Fake agent pieces
-# ============================================================
-
-def fake_planner(user_query: str) -> dict[str, Any]:
-    time.sleep(0.15)
-    return {
-        "goal": "answer user question",
-        "steps": [
-            "understand request",
-            "call weather tool",
-            "summarize result",
-        ],
-        "query": user_query,
-    }
-
-
-def fake_weather_tool(city: str) -> dict[str, Any]:
-    time.sleep(0.25)
-    return {
-        "city": city,
-        "forecast": "sunny",
-        "temperature_f": random.choice([68, 70, 72, 74]),
-    }
-
-
-def fake_model_response(plan: dict[str, Any], tool_result: dict[str, Any]) -> str:
-    time.sleep(0.30)
-    return (
-        f"The weather in {tool_result['city']} looks {tool_result['forecast']} "
-        f"at about {tool_result['temperature_f']}°F. "
-        f"Plan steps were: {', '.join(plan['steps'])}."
-    )
 
+def shutdown_tracing(timeout_millis: int = SHUTDOWN_TIMEOUT_MILLIS) -> bool:
+    """
+    Export every queued span, then stop the exporter. Returns False when
+    the flush timed out. Safe to call more than once; also runs at exit.
+    """
+    global _shut_down
+    if _shut_down:
+        return True
+    _shut_down = True
+    flushed = provider.force_flush(timeout_millis)
+    provider.shutdown()
+    return flushed
 
-# ============================================================
-# Agent execution
-# ============================================================
 
-def run_agent(user_query: str, city: str) -> str:
-    with tracer.start_as_current_span("agent.run", kind=SpanKind.INTERNAL) as root:
-        root.set_attribute("mlflow.spanType", "AGENT")
-        root.set_attribute("agent.name", "demo-weather-agent")
-        root.set_attribute("agent.framework", "custom")
-        root.set_attribute("user.query", user_query)
-        root.set_attribute(
-            "mlflow.spanInputs",
-            j(
-                {
-                    "messages": [
-                        {"role": "user", "content": user_query},
-                    ],
-                    "city": city,
-                }
-            ),
-        )
-
-        try:
-            with tracer.start_as_current_span("agent.plan", kind=SpanKind.INTERNAL) as plan_span:
-                plan_span.set_attribute("mlflow.spanType", "CHAIN")
-                plan_span.set_attribute("planner.name", "fake_planner")
-
-                plan = fake_planner(user_query)
-
-                plan_span.set_attribute("planner.step_count", len(plan["steps"]))
-                plan_span.add_event(
-                    "planning.complete",
-                    {"goal": plan["goal"]},
-                )
-
-            with tracer.start_as_current_span("tool.weather_lookup", kind=SpanKind.CLIENT) as tool_span:
-                tool_span.set_attribute("mlflow.spanType", "TOOL")
-                tool_span.set_attribute("tool.name", "weather_lookup")
-                tool_span.set_attribute("tool.city", city)
-                tool_span.set_attribute(
-                    "mlflow.spanInputs",
-                    j({"city": city}),
-                )
-
-                tool_result = fake_weather_tool(city)
-
-                tool_span.set_attribute(
-                    "mlflow.spanOutputs",
-                    j(tool_result),
-                )
-                tool_span.add_event(
-                    "tool.result.received",
-                    {
-                        "city": tool_result["city"],
-                        "forecast": tool_result["forecast"],
-                    },
-                )
-
-            with tracer.start_as_current_span("model.generate", kind=SpanKind.CLIENT) as llm_span:
-                llm_span.set_attribute("mlflow.spanType", "LLM")
-                llm_span.set_attribute("model.provider", "fake")
-                llm_span.set_attribute("model.name", "demo-model-v1")
-                llm_span.set_attribute(
-                    "mlflow.spanInputs",
-                    j(
-                        {
-                            "plan": plan,
-                            "tool_result": tool_result,
-                        }
-                    ),
-                )
-
-                answer = fake_model_response(plan, tool_result)
-
-                llm_span.set_attribute(
-                    "mlflow.spanOutputs",
-                    j({"answer": answer}),
-                )
-                llm_span.add_event(
-                    "generation.complete",
-                    {"output_length": len(answer)},
-                )
-
-            root.set_attribute(
-                "mlflow.spanOutputs",
-                j({"final_answer": answer}),
-            )
-            root.set_status(Status(StatusCode.OK))
-            return answer
-
-        except Exception as exc:
-            root.record_exception(exc)
-            root.set_status(Status(StatusCode.ERROR, str(exc)))
-            raise
+atexit.register(shutdown_tracing)
 
 
 if __name__ == "__main__":
@@ -181,5 +99,5 @@ if __name__ == "__main__":
     print("Agent answer:")
     print(result)
 
-    # Give the batch exporter time to flush before process exit.
-    time.sleep(2)
\ No newline at end of file
+    if not shutdown_tracing():
+        print(f"warning: spans still queued after {SHUTDOWN_TIMEOUT_MILLIS} ms; some were not exported")
\ No newline at end of file
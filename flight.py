@@ -1,11 +1,15 @@
 import os
-import re
-from dataclasses import dataclass, asdict
 from typing import Any, Dict, List, Optional
 
 import mlflow
 import pandas as pd
 
+from flight_cache import FlightSearchCache
+from flight_inventory import FlightInventory, FlightOption, SearchKey
+from flight_parser import BUDGET_PATTERN, parse_trip_request
+from flight_selection import CHEAPEST, SelectionCriteria, select_top_k
+from flight_tracing import traced, without
+
 
 # ------------------------------------------------------------------------------
 # Configuration
@@ -18,20 +22,6 @@ EXPERIMENT_NAME = "hosted-mlflow-flight-demo-structured"
 # Fake flight backend
 # ------------------------------------------------------------------------------
 
-@dataclass
-class FlightOption:
-    airline: str
-    flight_number: str
-    price: int
-    currency: str
-    origin: str
-    destination: str
-    depart_date: str
-    return_date: str
-    cabin: str
-    stops: int
-
-
 FLIGHT_DB = [
     FlightOption(
         airline="Delta",
@@ -107,62 +97,56 @@ FLIGHT_DB = [
     ),
 ]
 
+INVENTORY = FlightInventory(FLIGHT_DB)
+
+# Search results keyed by normalized constraints. Entries are FlightTable
+# views of INVENTORY, so call invalidate_search_cache() after changing it.
+SEARCH_CACHE = FlightSearchCache(
+    ttl_seconds=float(os.getenv("FLIGHT_SEARCH_CACHE_TTL", "300")),
+    max_entries=int(os.getenv("FLIGHT_SEARCH_CACHE_MAX_ENTRIES", "4096")),
+)
+
+
+def invalidate_search_cache() -> None:
+    SEARCH_CACHE.invalidate()
+
 
 # ------------------------------------------------------------------------------
 # Parsing helpers
 # ------------------------------------------------------------------------------
 
 def extract_budget(text: str) -> Optional[int]:
-    match = re.search(r"under\s*\$?(\d+)", text.lower())
+    match = BUDGET_PATTERN.search(text)
     return int(match.group(1)) if match else None
 
 
-def extract_dates(text: str) -> tuple[str, str]:
-    lower = text.lower()
-    if "may 10" in lower and "may 15" in lower:
-        return ("2026-05-10", "2026-05-15")
-    return ("2026-05-10", "2026-05-15")
-
-
-def parse_trip_request(query: str) -> Dict[str, Any]:
-    lower = query.lower()
-
-    origin = "NYC" if ("from nyc" in lower or "nyc to" in lower) else "UNKNOWN"
-
-    if "to london" in lower:
-        destination = "LON"
-    elif "to san francisco" in lower or "to sf" in lower or "to sfo" in lower:
-        destination = "SFO"
-    else:
-        destination = "UNKNOWN"
-
-    depart_date, return_date = extract_dates(query)
-    budget = extract_budget(query)
-
-    return {
-        "intent": "book_round_trip_flight",
-        "constraints": {
-            "origin": origin,
-            "destination": destination,
-            "depart_date": depart_date,
-            "return_date": return_date,
-            "max_price": budget,
-            "cabin": "economy",
-        },
-    }
+def normalize_search_key(
+    origin: str,
+    destination: str,
+    depart_date: str,
+    return_date: str,
+    cabin: str,
+) -> SearchKey:
+    return (
+        origin.strip().upper(),
+        destination.strip().upper(),
+        depart_date.strip(),
+        return_date.strip(),
+        cabin.strip().lower(),
+    )
 
 
 # ------------------------------------------------------------------------------
 # Structured tool calls
 # ------------------------------------------------------------------------------
 
-@mlflow.trace(name="tool.parse_request")
+@traced("tool.parse_request")
 def tool_parse_request(query: str) -> Dict[str, Any]:
     parsed = parse_trip_request(query)
     return parsed
 
 
-@mlflow.trace(name="tool.search_flights")
+@traced("tool.search_flights", summarize_outputs=without("results"))
 def tool_search_flights(
     origin: str,
     destination: str,
@@ -170,15 +154,25 @@ def tool_search_flights(
     return_date: str,
     cabin: str = "economy",
 ) -> Dict[str, Any]:
-    matches = [
-        asdict(f)
-        for f in FLIGHT_DB
-        if f.origin == origin
-        and f.destination == destination
-        and f.depart_date == depart_date
-        and f.return_date == return_date
-        and f.cabin == cabin
-    ]
+    key = normalize_search_key(origin, destination, depart_date, return_date, cabin)
+    generation = SEARCH_CACHE.generation
+    matches = SEARCH_CACHE.get(key)
+    hit = matches is not None
+    if not hit:
+        matches = INVENTORY.search(*key)
+        SEARCH_CACHE.put(key, matches, generation)
+
+    span = mlflow.get_current_active_span()
+    if span is not None:
+        stats = SEARCH_CACHE.stats()
+        span.set_attributes(
+            {
+                "search_cache.hit": hit,
+                "search_cache.hits": stats["hits"],
+                "search_cache.misses": stats["misses"],
+                "search_cache.entries": stats["entries"],
+            }
+        )
 
     return {
         "query": {
@@ -193,7 +187,7 @@ def tool_search_flights(
     }
 
 
-@mlflow.trace(name="tool.filter_by_budget")
+@traced("tool.filter_by_budget", summarize_outputs=without("results"))
 def tool_filter_by_budget(
     search_payload: Dict[str, Any],
     max_price: Optional[int],
@@ -202,7 +196,7 @@ def tool_filter_by_budget(
     if max_price is None:
         filtered = candidates
     else:
-        filtered = [r for r in candidates if r["price"] <= max_price]
+        filtered = candidates.filter_max_price(max_price)
 
     return {
         "max_price": max_price,
@@ -212,48 +206,58 @@ def tool_filter_by_budget(
     }
 
 
-@mlflow.trace(name="tool.select_flight_good")
-def tool_select_flight_good(filtered_payload: Dict[str, Any]) -> Dict[str, Any]:
-    results = filtered_payload["results"]
-    if not results:
+@traced("tool.select_flight_good")
+def tool_select_flight_good(
+    filtered_payload: Dict[str, Any],
+    criteria: SelectionCriteria = CHEAPEST,
+    n_alternatives: int = 2,
+) -> Dict[str, Any]:
+    ranked = select_top_k(filtered_payload["results"], 1 + n_alternatives, criteria)
+    if not ranked:
         return {
             "selected": None,
+            "alternatives": [],
             "selection_reason": "no matching flight within constraints",
         }
 
-    selected = sorted(results, key=lambda x: x["price"])[0]
     return {
-        "selected": selected,
-        "selection_reason": "lowest fare within constraints",
+        "selected": ranked[0].flight,
+        "alternatives": [r.flight for r in ranked[1:]],
+        "selection_reason": (
+            "lowest fare within constraints" if criteria.price_only
+            else "lowest weighted cost within constraints"
+        ),
     }
 
 
-@mlflow.trace(name="tool.select_flight_bad")
+PREFERRED_AIRLINES = ["Delta", "United", "JetBlue", "Alaska", "Norse", "BudgetAir"]
+
+
+@traced("tool.select_flight_bad")
 def tool_select_flight_bad(search_payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     Deliberately ignores user budget and picks a preferred airline.
     """
-    results = search_payload["results"]
-    if not results:
+    ranked = select_top_k(
+        search_payload["results"],
+        3,
+        SelectionCriteria.from_airline_order(PREFERRED_AIRLINES),
+    )
+    if not ranked:
         return {
             "selected": None,
+            "alternatives": [],
             "selection_reason": "no results available",
         }
 
-    preferred_order = ["Delta", "United", "JetBlue", "Alaska", "Norse", "BudgetAir"]
-    selected = sorted(
-        results,
-        key=lambda x: preferred_order.index(x["airline"])
-        if x["airline"] in preferred_order else 999
-    )[0]
-
     return {
-        "selected": selected,
+        "selected": ranked[0].flight,
+        "alternatives": [r.flight for r in ranked[1:]],
         "selection_reason": "preferred full-service airline",
     }
 
 
-@mlflow.trace(name="tool.compose_response")
+@traced("tool.compose_response")
 def tool_compose_response(selection_payload: Dict[str, Any]) -> Dict[str, Any]:
     selected = selection_payload["selected"]
     if not selected:
@@ -288,7 +292,7 @@ def tool_compose_response(selection_payload: Dict[str, Any]) -> Dict[str, Any]:
 # Agents
 # ------------------------------------------------------------------------------
 
-@mlflow.trace(name="agent.flight_booking_good")
+@traced("agent.flight_booking_good")
 def flight_agent_good(inputs: Dict[str, Any]) -> Dict[str, Any]:
     query = inputs["query"]
 
@@ -314,7 +318,7 @@ def flight_agent_good(inputs: Dict[str, Any]) -> Dict[str, Any]:
     return response_payload
 
 
-@mlflow.trace(name="agent.flight_booking_bad")
+@traced("agent.flight_booking_bad")
 def flight_agent_bad(inputs: Dict[str, Any]) -> Dict[str, Any]:
     query = inputs["query"]
 
@@ -336,7 +340,7 @@ def flight_agent_bad(inputs: Dict[str, Any]) -> Dict[str, Any]:
     return response_payload
 
 
-@mlflow.trace(name="agent.flight_booking_price_hallucination")
+@traced("agent.flight_booking_price_hallucination")
 def flight_agent_price_hallucination(inputs: Dict[str, Any]) -> Dict[str, Any]:
     query = inputs["query"]
 
@@ -357,8 +361,13 @@ def flight_agent_price_hallucination(inputs: Dict[str, Any]) -> Dict[str, Any]:
     )
     selection_payload = tool_select_flight_good(filtered_payload)
     response_payload = tool_compose_response(selection_payload)
+    return misreport_price(response_payload)
+
 
-    # Deliberately corrupt the final reported price
+def misreport_price(response_payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Deliberately corrupt the final reported price.
+    """
     if response_payload["itinerary"] is not None:
         response_payload["itinerary"]["price"] -= 100
         response_payload["message"] = (
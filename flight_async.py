@@ -0,0 +1,416 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flight import (
+    INVENTORY,
+    flight_agent_good,
+    misreport_price,
+    tool_compose_response,
+    tool_filter_by_budget,
+    tool_select_flight_bad,
+    tool_select_flight_good,
+)
+from flight_inventory import FlightInventory, FlightTable
+from flight_parser import AIRPORT_ALIASES, parse_trip_request
+from flight_tracing import OFF, TracingPolicy, traced, tracing_policy, without
+
+
+# ------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------
+
+# Alternative cities searched alongside the requested one when an agent is
+# asked to widen its search. Keys and values are the metro codes the parser
+# produces and the inventory is keyed by; airport aliases such as EWR or
+# LGW already resolve to their city.
+NEARBY_AIRPORTS = {
+    "NYC": ["BOS"],
+    "BOS": ["NYC"],
+    "LON": ["PAR"],
+    "PAR": ["LON"],
+    "SFO": ["LAX"],
+    "LAX": ["SFO"],
+}
+if not {c for k, v in NEARBY_AIRPORTS.items() for c in [k, *v]} <= AIRPORT_ALIASES.keys():
+    raise ValueError("NEARBY_AIRPORTS must use the parser's city codes")
+
+DEFAULT_SEARCH_TIMEOUT = 2.0
+
+# Results of a search that timed out. Shared by every fallback; FlightTable
+# operations return new tables, so it is never modified.
+_NO_RESULTS = FlightTable.concat([])
+
+
+# ------------------------------------------------------------------------------
+# Search backend
+# ------------------------------------------------------------------------------
+
+class InventoryBackend:
+    """
+    Async search over a FlightInventory with simulated network latency,
+    standing in for a remote fare search API.
+    """
+
+    def __init__(
+        self,
+        inventory: FlightInventory = INVENTORY,
+        latency_s: float = 0.0,
+        jitter_s: float = 0.0,
+    ):
+        self.inventory = inventory
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+
+    async def search(
+        self,
+        origin: str,
+        destination: str,
+        depart_date: str,
+        return_date: str,
+        cabin: str,
+    ) -> FlightTable:
+        delay = self.latency_s + random.uniform(0.0, self.jitter_s)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self.inventory.search(origin, destination, depart_date, return_date, cabin)
+
+    def search_blocking(self, *key: str) -> FlightTable:
+        """
+        Same search with the latency paid synchronously, for comparisons
+        against the sequential agents.
+        """
+        delay = self.latency_s + random.uniform(0.0, self.jitter_s)
+        if delay > 0:
+            time.sleep(delay)
+        return self.inventory.search(*key)
+
+
+DEFAULT_BACKEND = InventoryBackend()
+
+
+# ------------------------------------------------------------------------------
+# DAG executor
+# ------------------------------------------------------------------------------
+
+_REQUIRED = object()
+
+
+class StepTimeout(Exception):
+    def __init__(self, name: str, timeout: float):
+        super().__init__(f"Step '{name}' timed out after {timeout}s")
+        self.name = name
+        self.timeout = timeout
+
+
+@dataclass
+class Step:
+    """
+    One node of an agent pipeline.
+
+    fn: coroutine function called with the results of deps as keyword
+        arguments (keyed by step name).
+    timeout: seconds before the step is cancelled; None waits forever.
+    fallback: result used when the step times out. Without one the
+        timeout fails the whole run with StepTimeout.
+    """
+
+    fn: Callable[..., Awaitable[Any]]
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    fallback: Any = _REQUIRED
+
+
+def _check_dag(steps: Dict[str, Step]) -> None:
+    for name, step in steps.items():
+        unknown = [dep for dep in step.deps if dep not in steps]
+        if unknown:
+            raise ValueError(f"Step '{name}' depends on unknown steps {unknown}")
+
+    visiting, done = set(), set()
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through step '{name}'")
+        visiting.add(name)
+        for dep in steps[name].deps:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in steps:
+        visit(name)
+
+
+async def run_dag(steps: Dict[str, Step]) -> Dict[str, Any]:
+    """
+    Run every step as soon as its dependencies finish, so independent
+    steps overlap and total latency follows the critical path. Returns
+    the result of every step; the first failure cancels the rest.
+    """
+    _check_dag(steps)
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(name: str) -> Any:
+        step = steps[name]
+        kwargs = {dep: await tasks[dep] for dep in step.deps}
+        try:
+            return await asyncio.wait_for(step.fn(**kwargs), step.timeout)
+        except asyncio.TimeoutError:
+            if step.fallback is _REQUIRED:
+                raise StepTimeout(name, step.timeout) from None
+            return step.fallback
+
+    # Tasks copy the current context, so spans opened by steps nest under
+    # the caller's span
+    for name in steps:
+        tasks[name] = asyncio.ensure_future(run(name))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return {name: task.result() for name, task in tasks.items()}
+
+
+# ------------------------------------------------------------------------------
+# Async tools
+# ------------------------------------------------------------------------------
+
+@traced("tool.parse_request")
+async def atool_parse_request(query: str) -> Dict[str, Any]:
+    return parse_trip_request(query)
+
+
+@traced("tool.search_flights", summarize_outputs=without("results"))
+async def atool_search_flights(
+    origin: str,
+    destination: str,
+    depart_date: str,
+    return_date: str,
+    cabin: str = "economy",
+    backend: InventoryBackend = DEFAULT_BACKEND,
+) -> Dict[str, Any]:
+    matches = await backend.search(origin, destination, depart_date, return_date, cabin)
+
+    return {
+        "query": {
+            "origin": origin,
+            "destination": destination,
+            "depart_date": depart_date,
+            "return_date": return_date,
+            "cabin": cabin,
+        },
+        "result_count": len(matches),
+        "results": matches,
+    }
+
+
+@traced("tool.merge_results", summarize_outputs=without("results"))
+async def atool_merge_results(search_payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged = FlightTable.concat([p["results"] for p in search_payloads]).sort_by_price()
+    return {
+        "queries": [p["query"] for p in search_payloads],
+        "result_count": len(merged),
+        "results": merged,
+    }
+
+
+# ------------------------------------------------------------------------------
+# Pipelines
+# ------------------------------------------------------------------------------
+
+def search_plan(
+    constraints: Dict[str, Any],
+    cabins: Optional[Iterable[str]] = None,
+    nearby: bool = False,
+) -> List[Dict[str, str]]:
+    """
+    Search requests fanned out from one set of constraints: every cabin,
+    and with nearby=True every pairing of alternative airports.
+    """
+    origins = [constraints["origin"]]
+    destinations = [constraints["destination"]]
+    if nearby:
+        origins += NEARBY_AIRPORTS.get(constraints["origin"], [])
+        destinations += NEARBY_AIRPORTS.get(constraints["destination"], [])
+
+    return [
+        {
+            "origin": origin,
+            "destination": destination,
+            "depart_date": constraints["depart_date"],
+            "return_date": constraints["return_date"],
+            "cabin": cabin,
+        }
+        for origin in origins
+        for destination in destinations
+        for cabin in (cabins or [constraints["cabin"]])
+    ]
+
+
+async def _search_and_merge(
+    constraints: Dict[str, Any],
+    cabins: Optional[Iterable[str]],
+    nearby: bool,
+    backend: InventoryBackend,
+    search_timeout: Optional[float],
+) -> Dict[str, Any]:
+    requests = search_plan(constraints, cabins, nearby)
+
+    def search_step(request: Dict[str, str], required: bool) -> Step:
+        async def search() -> Dict[str, Any]:
+            return await atool_search_flights(**request, backend=backend)
+
+        # Only the search for the exact request is required; alternatives
+        # that time out are dropped from the merge
+        fallback = _REQUIRED if required else {
+            "query": request,
+            "result_count": 0,
+            "results": _NO_RESULTS,
+        }
+        return Step(search, timeout=search_timeout, fallback=fallback)
+
+    steps = {
+        f"search:{i}": search_step(request, required=(i == 0))
+        for i, request in enumerate(requests)
+    }
+
+    async def merge(**payloads: Dict[str, Any]) -> Dict[str, Any]:
+        ordered = [payloads[f"search:{i}"] for i in range(len(requests))]
+        if len(ordered) == 1:
+            return ordered[0]
+        return await atool_merge_results(ordered)
+
+    steps["merge"] = Step(merge, deps=tuple(steps))
+    return (await run_dag(steps))["merge"]
+
+
+# ------------------------------------------------------------------------------
+# Async agents
+# ------------------------------------------------------------------------------
+
+@traced("agent.flight_booking_good")
+async def aflight_agent_good(
+    inputs: Dict[str, Any],
+    cabins: Optional[List[str]] = None,
+    nearby: bool = False,
+    backend: InventoryBackend = DEFAULT_BACKEND,
+    search_timeout: Optional[float] = DEFAULT_SEARCH_TIMEOUT,
+) -> Dict[str, Any]:
+    parsed = await atool_parse_request(inputs["query"])
+    constraints = parsed["constraints"]
+
+    search_payload = await _search_and_merge(constraints, cabins, nearby, backend, search_timeout)
+    filtered_payload = tool_filter_by_budget(
+        search_payload=search_payload,
+        max_price=constraints["max_price"],
+    )
+    selection_payload = tool_select_flight_good(filtered_payload)
+    return tool_compose_response(selection_payload)
+
+
+@traced("agent.flight_booking_bad")
+async def aflight_agent_bad(
+    inputs: Dict[str, Any],
+    cabins: Optional[List[str]] = None,
+    nearby: bool = False,
+    backend: InventoryBackend = DEFAULT_BACKEND,
+    search_timeout: Optional[float] = DEFAULT_SEARCH_TIMEOUT,
+) -> Dict[str, Any]:
+    parsed = await atool_parse_request(inputs["query"])
+    constraints = parsed["constraints"]
+
+    search_payload = await _search_and_merge(constraints, cabins, nearby, backend, search_timeout)
+    # Intentionally skip budget filtering to create a bad trace
+    selection_payload = tool_select_flight_bad(search_payload)
+    return tool_compose_response(selection_payload)
+
+
+@traced("agent.flight_booking_price_hallucination")
+async def aflight_agent_price_hallucination(
+    inputs: Dict[str, Any],
+    cabins: Optional[List[str]] = None,
+    nearby: bool = False,
+    backend: InventoryBackend = DEFAULT_BACKEND,
+    search_timeout: Optional[float] = DEFAULT_SEARCH_TIMEOUT,
+) -> Dict[str, Any]:
+    parsed = await atool_parse_request(inputs["query"])
+    constraints = parsed["constraints"]
+
+    search_payload = await _search_and_merge(constraints, cabins, nearby, backend, search_timeout)
+    filtered_payload = tool_filter_by_budget(
+        search_payload=search_payload,
+        max_price=constraints["max_price"],
+    )
+    selection_payload = tool_select_flight_good(filtered_payload)
+    return misreport_price(tool_compose_response(selection_payload))
+
+
+# ------------------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------------------
+
+def _sequential_agent(inputs: Dict[str, Any], backend: InventoryBackend, cabins: List[str], nearby: bool) -> Dict[str, Any]:
+    """
+    flight_agent_good with the same fan-out, one blocking search at a time.
+    """
+    constraints = parse_trip_request(inputs["query"])["constraints"]
+    tables = [
+        backend.search_blocking(*request.values())
+        for request in search_plan(constraints, cabins, nearby)
+    ]
+    filtered = tool_filter_by_budget(
+        search_payload={"results": FlightTable.concat(tables).sort_by_price()},
+        max_price=constraints["max_price"],
+    )
+    return tool_compose_response(tool_select_flight_good(filtered))
+
+
+def benchmark(latency_s: float = 0.05, n_calls: int = 20) -> None:
+    sample = {
+        "query": (
+            "Find me a round-trip flight from NYC to London, "
+            "leaving May 10 and returning May 15, under $800"
+        )
+    }
+    backend = InventoryBackend(latency_s=latency_s)
+    cabins = ["economy", "premium_economy", "business"]
+
+    with tracing_policy(TracingPolicy(mode=OFF)):
+        expected = flight_agent_good(sample)
+        for nearby in (False, True):
+            n_searches = len(search_plan(parse_trip_request(sample["query"])["constraints"], cabins, nearby))
+
+            start = time.perf_counter()
+            for _ in range(n_calls):
+                sequential = _sequential_agent(sample, backend, cabins, nearby)
+            sequential_ms = (time.perf_counter() - start) / n_calls * 1e3
+
+            async def run_async() -> Dict[str, Any]:
+                for _ in range(n_calls):
+                    result = await aflight_agent_good(sample, cabins=cabins, nearby=nearby, backend=backend)
+                return result
+
+            start = time.perf_counter()
+            concurrent = asyncio.run(run_async())
+            concurrent_ms = (time.perf_counter() - start) / n_calls * 1e3
+
+            if sequential != concurrent or (not nearby and concurrent != expected):
+                raise AssertionError("async agent disagrees with the sequential agent")
+            print(
+                f"{n_searches:2d} searches @ {latency_s * 1e3:.0f} ms: "
+                f"sequential {sequential_ms:7.1f} ms/agent, "
+                f"concurrent {concurrent_ms:6.1f} ms/agent"
+            )
+
+
+if __name__ == "__main__":
+    benchmark()
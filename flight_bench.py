@@ -0,0 +1,233 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import mlflow
+import numpy as np
+
+from flight import (
+    flight_agent_bad,
+    flight_agent_good,
+    flight_agent_price_hallucination,
+    tool_compose_response,
+    tool_filter_by_budget,
+    tool_parse_request,
+    tool_search_flights,
+    tool_select_flight_bad,
+    tool_select_flight_good,
+)
+from flight_tracing import FULL, OFF, TracingPolicy, tracing_policy
+
+
+# ------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------
+
+BENCH_EXPERIMENT_NAME = "flight-bench"
+
+BENCH_QUERY = (
+    "Find me a round-trip flight from NYC to London, "
+    "leaving May 10 and returning May 15, under $800"
+)
+
+TRACING_MODES = {
+    "off": TracingPolicy(mode=OFF),
+    "on": TracingPolicy(mode=FULL),
+}
+
+PERCENTILES = {"p50": 50, "p95": 95, "p99": 99}
+
+# Default regression gate: fail when a case's p50 is more than 25% above
+# the saved baseline
+DEFAULT_BUDGET_STAT = "p50"
+DEFAULT_BUDGET = 0.25
+
+
+# ------------------------------------------------------------------------------
+# Cases
+# ------------------------------------------------------------------------------
+
+def bench_cases() -> Dict[str, Callable[[], Any]]:
+    """
+    One zero-argument callable per tool and agent, named after the span
+    it produces. Tool inputs are prepared once so each case measures only
+    its own tool. The setup calls run untraced, so they add no spans to
+    the measurement.
+    """
+    with tracing_policy(TracingPolicy(mode=OFF)):
+        constraints = tool_parse_request(BENCH_QUERY)["constraints"]
+        search_args = {
+            name: constraints[name]
+            for name in ("origin", "destination", "depart_date", "return_date", "cabin")
+        }
+        search_payload = tool_search_flights(**search_args)
+        filtered_payload = tool_filter_by_budget(search_payload, constraints["max_price"])
+        selection_payload = tool_select_flight_good(filtered_payload)
+    inputs = {"query": BENCH_QUERY}
+
+    return {
+        "tool.parse_request": lambda: tool_parse_request(BENCH_QUERY),
+        "tool.search_flights": lambda: tool_search_flights(**search_args),
+        "tool.filter_by_budget": lambda: tool_filter_by_budget(search_payload, constraints["max_price"]),
+        "tool.select_flight_good": lambda: tool_select_flight_good(filtered_payload),
+        "tool.select_flight_bad": lambda: tool_select_flight_bad(search_payload),
+        "tool.compose_response": lambda: tool_compose_response(selection_payload),
+        "agent.flight_booking_good": lambda: flight_agent_good(inputs),
+        "agent.flight_booking_bad": lambda: flight_agent_bad(inputs),
+        "agent.flight_booking_price_hallucination": lambda: flight_agent_price_hallucination(inputs),
+    }
+
+
+# ------------------------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------------------------
+
+@contextmanager
+def local_store() -> Iterator[str]:
+    """
+    Point MLflow at a throwaway SQLite file so traced runs never reach a
+    shared server. The filesystem ("./mlruns") store no longer accepts
+    traces, so a local database file stands in for it.
+    """
+    previous_uri = mlflow.get_tracking_uri()
+    with tempfile.TemporaryDirectory(prefix="flight-bench-") as tmp_dir:
+        mlflow.set_tracking_uri(f"sqlite:///{os.path.join(tmp_dir, 'mlflow.db')}")
+        experiment_id = mlflow.set_experiment(BENCH_EXPERIMENT_NAME).experiment_id
+        try:
+            yield experiment_id
+        finally:
+            mlflow.flush_trace_async_logging()
+            mlflow.set_tracking_uri(previous_uri)
+
+
+def summarize(durations_ns: List[int]) -> Dict[str, float]:
+    durations_us = np.asarray(durations_ns, dtype=float) / 1e3
+    stats = {name: float(np.percentile(durations_us, q)) for name, q in PERCENTILES.items()}
+    stats["mean"] = float(durations_us.mean())
+    stats["ops"] = float(1e6 / durations_us.mean())
+    stats["rounds"] = len(durations_us)
+    return stats
+
+
+def time_case(fn: Callable[[], Any], rounds: int, warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    durations = []
+    clock = time.perf_counter_ns
+    for _ in range(rounds):
+        start = clock()
+        fn()
+        durations.append(clock() - start)
+    return summarize(durations)
+
+
+def span_durations(experiment_id: str) -> Dict[str, Dict[str, float]]:
+    """
+    Percentiles of the recorded span durations per span name, covering
+    tool spans nested inside agent traces as well as standalone calls.
+    """
+    mlflow.flush_trace_async_logging()
+    durations: Dict[str, List[int]] = {}
+    for trace in mlflow.search_traces(locations=[experiment_id], return_type="list", max_results=100_000):
+        for span in trace.data.spans:
+            durations.setdefault(span.name, []).append(span.end_time_ns - span.start_time_ns)
+    return {name: summarize(values) for name, values in sorted(durations.items())}
+
+
+def run_suite(rounds: int = 300, warmup: int = 20) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Time every case with tracing off and on. Returns
+    {"off": {case: stats}, "on": {case: stats}, "spans": {span: stats}},
+    with latencies in microseconds.
+    """
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with local_store() as experiment_id:
+        cases = bench_cases()
+        for mode, policy in TRACING_MODES.items():
+            with tracing_policy(policy):
+                results[mode] = {name: time_case(fn, rounds, warmup) for name, fn in cases.items()}
+        results["spans"] = span_durations(experiment_id)
+    return results
+
+
+# ------------------------------------------------------------------------------
+# Reporting and regression budget
+# ------------------------------------------------------------------------------
+
+def print_report(results: Dict[str, Dict[str, Dict[str, float]]]) -> None:
+    sections = [
+        ("off", "tracing off", "ops/s", "ops"),
+        ("on", "tracing on", "ops/s", "ops"),
+        ("spans", "span durations (tracing on)", "spans", "rounds"),
+    ]
+    for section, title, last_column, last_stat in sections:
+        print(f"\n{title}")
+        print(f"{'':42s} {'p50 us':>10s} {'p95 us':>10s} {'p99 us':>10s} {last_column:>10s}")
+        for name, stats in results[section].items():
+            print(
+                f"{name:42s} {stats['p50']:10.1f} {stats['p95']:10.1f} "
+                f"{stats['p99']:10.1f} {stats[last_stat]:10,.0f}"
+            )
+
+
+def check_budget(
+    results: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    stat: str = DEFAULT_BUDGET_STAT,
+    budget: float = DEFAULT_BUDGET,
+) -> List[str]:
+    """
+    Cases whose stat grew by more than budget (a fraction) over the
+    baseline. Cases missing from either side are ignored.
+    """
+    regressions = []
+    for section in ("off", "on"):
+        for name, stats in results.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if previous is None:
+                continue
+            limit = previous[stat] * (1.0 + budget)
+            if stats[stat] > limit:
+                regressions.append(
+                    f"[tracing {section}] {name}: {stat} {stats[stat]:.1f} us "
+                    f"> {limit:.1f} us (baseline {previous[stat]:.1f} us + {budget:.0%})"
+                )
+    return regressions
+
+
+def main(
+    baseline_path: Optional[str] = os.getenv("FLIGHT_BENCH_BASELINE"),
+    budget: float = float(os.getenv("FLIGHT_BENCH_BUDGET", str(DEFAULT_BUDGET))),
+    rounds: int = int(os.getenv("FLIGHT_BENCH_ROUNDS", "300")),
+) -> None:
+    """
+    Run the suite and print the report. With a baseline path, the first
+    run saves the baseline and later runs exit non-zero on regressions.
+    """
+    results = run_suite(rounds=rounds)
+    print_report(results)
+
+    if not baseline_path:
+        return
+    if not os.path.exists(baseline_path):
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nsaved baseline to {baseline_path}")
+        return
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = check_budget(results, baseline, budget=budget)
+    if regressions:
+        print("\nregression budget exceeded:")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+    print(f"\nwithin {budget:.0%} of baseline {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
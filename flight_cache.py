@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class FlightSearchCache:
+    """
+    TTL + LRU map from normalized search keys to search results.
+
+    invalidate() drops every entry and bumps the generation; results
+    computed against an older generation are not stored, so a search that
+    raced an inventory change cannot repopulate the cache with old data.
+    Cached values are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300.0,
+        max_entries: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+
+        self._entries: OrderedDict[Hashable, Tuple[Any, float]] = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() - entry[1] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,207 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import mlflow
+import pandas as pd
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
+
+from flight import (
+    EXPERIMENT_NAME,
+    INVENTORY,
+    flight_agent_bad,
+    flight_agent_good,
+    flight_agent_price_hallucination,
+)
+from flight_scorers import batch_score
+from flight_tracing import OFF, TracingPolicy, set_tracing_policy
+
+
+# ------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------
+
+# Agents are referenced by name so worker processes resolve them on import
+AGENTS = {
+    "good": flight_agent_good,
+    "bad": flight_agent_bad,
+    "price_hallucination": flight_agent_price_hallucination,
+}
+
+DESTINATION_ALIASES = {
+    "LON": ["London"],
+    "SFO": ["San Francisco", "SF", "SFO"],
+}
+
+QUERY_TEMPLATES = [
+    "Find me a round-trip flight from NYC to {city}, leaving May 10 and returning May 15, under ${budget}",
+    "Round trip NYC to {city} May 10 - May 15 under ${budget} please",
+    "I need a flight from NYC to {city}, May 10 to May 15, under {budget} dollars",
+]
+
+
+# ------------------------------------------------------------------------------
+# Evaluation dataset
+# ------------------------------------------------------------------------------
+
+def expected_selection(destination: str, budget: int) -> Dict[str, Any]:
+    matches = INVENTORY.search("NYC", destination, "2026-05-10", "2026-05-15", "economy", max_price=budget)
+    if not len(matches):
+        return {"expected_airline": None, "expected_price": None}
+    best = matches.record(matches.argmin())
+    return {"expected_airline": best["airline"], "expected_price": best["price"]}
+
+
+def generate_eval_data(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Synthetic queries in the shape of flight.build_eval_data, with the
+    cheapest in-budget flight as the expectation.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n_rows):
+        destination = rng.choice(list(DESTINATION_ALIASES))
+        city = rng.choice(DESTINATION_ALIASES[destination])
+        budget = rng.randrange(150, 1000, 10)
+        query = rng.choice(QUERY_TEMPLATES).format(city=city, budget=budget)
+        rows.append(
+            {
+                "inputs": {"query": query},
+                "expectations": [expected_selection(destination, budget)],
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def load_eval_data(path: str) -> pd.DataFrame:
+    """
+    Load queries from a CSV/Parquet/JSONL file with columns query,
+    expected_airline and expected_price.
+    """
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    elif path.endswith(".jsonl"):
+        df = pd.read_json(path, lines=True)
+    else:
+        df = pd.read_csv(path)
+
+    def expectation(row) -> Dict[str, Any]:
+        price = row.get("expected_price")
+        airline = row.get("expected_airline")
+        return {
+            "expected_airline": None if pd.isna(airline) else airline,
+            "expected_price": None if pd.isna(price) else int(price),
+        }
+
+    return pd.DataFrame(
+        {
+            "inputs": [{"query": q} for q in df["query"]],
+            "expectations": [[expectation(row)] for row in df.to_dict("records")],
+        }
+    )
+
+
+# ------------------------------------------------------------------------------
+# Parallel execution
+# ------------------------------------------------------------------------------
+
+def _init_worker(policy: TracingPolicy) -> None:
+    set_tracing_policy(policy)
+
+
+def _run_chunk(agent_name: str, start: int, queries: List[str]) -> tuple[str, int, List[Dict[str, Any]]]:
+    agent_fn = AGENTS[agent_name]
+    return agent_name, start, [agent_fn({"query": q}) for q in queries]
+
+
+def run_parallel_evaluation(
+    eval_df: pd.DataFrame,
+    agent_names: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
+    chunk_size: int = 250,
+    tracing: TracingPolicy = TracingPolicy(mode=OFF),
+    log_to_mlflow: bool = True,
+) -> pd.DataFrame:
+    """
+    Run every agent over eval_df across one process pool, score the
+    outputs and log one MLflow run of aggregated metrics per agent.
+    Returns a summary table with one row per agent.
+
+    Agents share the pool, so completion_seconds is the time until an
+    agent's last chunk finished, not a per-call latency; rows_per_second
+    is derived from it.
+    """
+    agent_names = agent_names or list(AGENTS)
+    n_rows = len(eval_df)
+    if n_rows == 0:
+        print("no rows to evaluate")
+        return pd.DataFrame({"agent": agent_names})
+    queries = [inputs["query"] for inputs in eval_df["inputs"]]
+
+    outputs: Dict[str, List[Optional[Dict[str, Any]]]] = {name: [None] * n_rows for name in agent_names}
+    pending_chunks = {name: 0 for name in agent_names}
+    completion_seconds: Dict[str, float] = {}
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(tracing,),
+    ) as pool:
+        futures = []
+        # Interleave agents so all of them make progress concurrently
+        for offset in range(0, n_rows, chunk_size):
+            for name in agent_names:
+                futures.append(pool.submit(_run_chunk, name, offset, queries[offset:offset + chunk_size]))
+                pending_chunks[name] += 1
+
+        for future in as_completed(futures):
+            name, offset, chunk_outputs = future.result()
+            outputs[name][offset:offset + len(chunk_outputs)] = chunk_outputs
+            pending_chunks[name] -= 1
+            if not pending_chunks[name]:
+                completion_seconds[name] = time.perf_counter() - start
+    wall_seconds = time.perf_counter() - start
+
+    summary = []
+    for name in agent_names:
+        _, metrics = batch_score(eval_df["inputs"].tolist(), outputs[name], eval_df["expectations"].tolist())
+        metrics["completion_seconds"] = completion_seconds[name]
+        metrics["rows_per_second"] = n_rows / completion_seconds[name]
+
+        if log_to_mlflow:
+            params = {
+                "demo": "flight_booking_structured",
+                "agent_fn": AGENTS[name].__name__,
+                "n_rows": n_rows,
+                "max_workers": max_workers or os.cpu_count(),
+                "tracing_mode": tracing.mode,
+                "trace_sample_rate": tracing.sample_rate,
+            }
+            timestamp = int(time.time() * 1000)
+            with mlflow.start_run(run_name=f"eval_{name}_parallel") as run:
+                # Params and metrics in a single request
+                MlflowClient().log_batch(
+                    run.info.run_id,
+                    metrics=[Metric(key, float(value), timestamp, 0) for key, value in metrics.items()],
+                    params=[Param(key, str(value)) for key, value in params.items()],
+                )
+
+        summary.append({"agent": name, **metrics})
+
+    print(f"evaluated {len(agent_names)} agents x {n_rows} rows in {wall_seconds:.2f} s "
+          f"({len(agent_names) * n_rows / wall_seconds:.0f} rows/s overall)")
+    return pd.DataFrame(summary)
+
+
+def main(n_rows: int = 5000):
+    mlflow.set_experiment(EXPERIMENT_NAME)
+    eval_df = generate_eval_data(n_rows)
+    print(run_parallel_evaluation(eval_df).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
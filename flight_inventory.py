@@ -0,0 +1,405 @@
+import random
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------------------------------------------------------
+# Flight records
+# ------------------------------------------------------------------------------
+
+@dataclass
+class FlightOption:
+    airline: str
+    flight_number: str
+    price: int
+    currency: str
+    origin: str
+    destination: str
+    depart_date: str
+    return_date: str
+    cabin: str
+    stops: int
+
+
+FLIGHT_FIELDS = [f.name for f in fields(FlightOption)]
+
+# (origin, destination, depart_date, return_date, cabin)
+SearchKey = Tuple[str, str, str, str, str]
+
+
+def search_key(flight: FlightOption) -> SearchKey:
+    return (
+        flight.origin,
+        flight.destination,
+        flight.depart_date,
+        flight.return_date,
+        flight.cabin,
+    )
+
+
+# ------------------------------------------------------------------------------
+# Columnar flight table
+# ------------------------------------------------------------------------------
+
+# String columns with few distinct values are stored as integer codes
+CATEGORICAL_FIELDS = [
+    "airline",
+    "currency",
+    "origin",
+    "destination",
+    "depart_date",
+    "return_date",
+    "cabin",
+]
+NUMERIC_FIELDS = {"price": np.int64, "stops": np.int16}
+KEY_FIELDS = ["origin", "destination", "depart_date", "return_date", "cabin"]
+
+
+class FlightTable:
+    """
+    Column-oriented set of flights backed by NumPy arrays.
+
+    Row selections (slices, masks, index arrays) produce new tables that
+    share the category arrays, and slices are zero-copy views. Rows are
+    only turned into dicts by record() / to_records().
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        categories: Dict[str, np.ndarray],
+        sorted_by_price: bool = False,
+    ):
+        self.columns = columns
+        self.categories = categories
+        self.sorted_by_price = sorted_by_price
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "FlightTable":
+        missing = set(FLIGHT_FIELDS) - set(df.columns)
+        if missing:
+            raise ValueError(f"Flight table is missing columns: {sorted(missing)}")
+
+        columns: Dict[str, np.ndarray] = {}
+        categories: Dict[str, np.ndarray] = {}
+        for name in CATEGORICAL_FIELDS:
+            codes, uniques = pd.factorize(df[name].astype(str))
+            columns[name] = codes.astype(np.int32)
+            categories[name] = np.asarray(uniques, dtype=object)
+        for name, dtype in NUMERIC_FIELDS.items():
+            columns[name] = df[name].to_numpy(dtype=dtype)
+        columns["flight_number"] = df["flight_number"].astype(str).to_numpy(dtype=object)
+        return cls(columns, categories)
+
+    @classmethod
+    def from_flights(cls, flights: Iterable[FlightOption]) -> "FlightTable":
+        rows = [vars(f) for f in flights]
+        return cls.from_frame(pd.DataFrame(rows, columns=FLIGHT_FIELDS))
+
+    @classmethod
+    def concat(cls, tables: List["FlightTable"]) -> "FlightTable":
+        """
+        Stack tables row-wise. Tables sharing their category arrays (e.g.
+        slices of one inventory) are joined code-wise without re-encoding.
+        """
+        tables = [t for t in tables if len(t)]
+        if not tables:
+            return cls.from_flights([])
+        if len(tables) == 1:
+            return tables[0]
+        if all(t.categories is tables[0].categories for t in tables):
+            columns = {
+                name: np.concatenate([t.columns[name] for t in tables])
+                for name in tables[0].columns
+            }
+            return cls(columns, tables[0].categories)
+        return cls.from_frame(pd.concat([t.to_frame() for t in tables], ignore_index=True))
+
+    def to_frame(self) -> pd.DataFrame:
+        data = {}
+        for name in FLIGHT_FIELDS:
+            if name in self.categories:
+                data[name] = self.categories[name][self.columns[name]]
+            else:
+                data[name] = self.columns[name]
+        return pd.DataFrame(data, columns=FLIGHT_FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.columns["price"])
+
+    def __getitem__(self, rows) -> "FlightTable":
+        # Slices keep price order; masks and index arrays only if they are ordered
+        keeps_order = isinstance(rows, slice) and rows.step in (None, 1)
+        if not keeps_order and isinstance(rows, np.ndarray) and rows.dtype == bool:
+            keeps_order = True
+        return FlightTable(
+            {name: values[rows] for name, values in self.columns.items()},
+            self.categories,
+            sorted_by_price=self.sorted_by_price and keeps_order,
+        )
+
+    def __repr__(self) -> str:
+        if not len(self):
+            return "FlightTable(rows=0)"
+        prices = self.columns["price"]
+        return f"FlightTable(rows={len(self)}, min_price={prices.min()}, max_price={prices.max()})"
+
+    def decoded(self, name: str) -> np.ndarray:
+        return self.categories[name][self.columns[name]]
+
+    # --------------------------------------------------------------------------
+    # Vectorized operations
+    # --------------------------------------------------------------------------
+
+    def sort_by_price(self) -> "FlightTable":
+        if self.sorted_by_price:
+            return self
+        table = self[np.argsort(self.columns["price"], kind="stable")]
+        table.sorted_by_price = True
+        return table
+
+    def filter_max_price(self, max_price: int) -> "FlightTable":
+        prices = self.columns["price"]
+        if self.sorted_by_price:
+            return self[:int(np.searchsorted(prices, max_price, side="right"))]
+        return self[prices <= max_price]
+
+    def rank_by_preference(self, name: str, preferred: List[str], default: int = 999) -> np.ndarray:
+        """
+        Rank of each row's value in a preference list (default when absent),
+        computed once per category instead of once per row.
+        """
+        order = {value: i for i, value in enumerate(preferred)}
+        rank_by_code = np.array(
+            [order.get(value, default) for value in self.categories[name]],
+            dtype=np.int32,
+        )
+        return rank_by_code[self.columns[name]]
+
+    def argmin(self, scores: Optional[np.ndarray] = None) -> int:
+        """
+        Row with the lowest score (price by default), first row on ties.
+        """
+        if scores is None:
+            if self.sorted_by_price:
+                return 0
+            scores = self.columns["price"]
+        return int(np.argmin(scores))
+
+    def top_k(self, k: int, scores: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Row indices of the k lowest scores (price by default), in order,
+        earlier rows first on ties.
+        """
+        if scores is None:
+            if self.sorted_by_price:
+                return np.arange(min(k, len(self)))
+            scores = self.columns["price"]
+        if k >= len(scores):
+            return np.argsort(scores, kind="stable")
+        # argpartition picks arbitrary rows among ties at the cutoff, so
+        # take everything below it and the earliest rows equal to it
+        kth = np.partition(scores, k - 1)[k - 1]
+        below = np.flatnonzero(scores < kth)
+        ties = np.flatnonzero(scores == kth)[:k - len(below)]
+        candidates = np.concatenate([below, ties])
+        return candidates[np.argsort(scores[candidates], kind="stable")]
+
+    # --------------------------------------------------------------------------
+    # Materialization
+    # --------------------------------------------------------------------------
+
+    def record(self, row: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for name in FLIGHT_FIELDS:
+            value = self.columns[name][row]
+            if name in self.categories:
+                out[name] = self.categories[name][value]
+            elif name in NUMERIC_FIELDS:
+                out[name] = int(value)
+            else:
+                out[name] = value
+        return out
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return [self.record(i) for i in range(len(self))]
+
+
+# ------------------------------------------------------------------------------
+# Inventory store
+# ------------------------------------------------------------------------------
+
+class FlightInventory:
+    """
+    Flights grouped by search key, each group stored as a contiguous,
+    price-sorted run of one FlightTable.
+
+    A search is a dictionary lookup returning a zero-copy slice, and budget
+    filtering is a binary search over that slice's prices.
+    """
+
+    def __init__(self, flights: Iterable[FlightOption] = ()):
+        self._table = FlightTable.from_flights([])
+        self._ranges: Dict[SearchKey, Tuple[int, int]] = {}
+        self.add_many(flights)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def add_many(self, flights: Iterable[FlightOption]) -> None:
+        self.add_table(FlightTable.from_flights(flights))
+
+    def add_table(self, table: FlightTable) -> None:
+        if not len(table):
+            return
+        frame = pd.concat([self._table.to_frame(), table.to_frame()], ignore_index=True)
+        self._build(FlightTable.from_frame(frame))
+
+    def _build(self, table: FlightTable) -> None:
+        # Sort by (search key, price) so each key is one price-sorted run
+        key_codes = [table.columns[name] for name in KEY_FIELDS]
+        order = np.lexsort([table.columns["price"]] + key_codes[::-1])
+        table = table[order]
+        if not len(table):
+            self._table, self._ranges = table, {}
+            return
+
+        stacked = np.stack([table.columns[name] for name in KEY_FIELDS], axis=1)
+        boundaries = np.flatnonzero(np.any(stacked[1:] != stacked[:-1], axis=1)) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(table)]])
+
+        ranges = {}
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            key = tuple(
+                table.categories[name][stacked[start, i]]
+                for i, name in enumerate(KEY_FIELDS)
+            )
+            ranges[key] = (start, end)
+
+        self._table = table
+        self._ranges = ranges
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        depart_date: str,
+        return_date: str,
+        cabin: str = "economy",
+        max_price: Optional[int] = None,
+    ) -> FlightTable:
+        """
+        Matching flights as a price-sorted table view.
+        """
+        key = (origin, destination, depart_date, return_date, cabin)
+        start, end = self._ranges.get(key, (0, 0))
+        result = self._table[start:end]
+        result.sorted_by_price = True
+        if max_price is not None:
+            result = result.filter_max_price(max_price)
+        return result
+
+    # --------------------------------------------------------------------------
+    # Loaders
+    # --------------------------------------------------------------------------
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "FlightInventory":
+        inventory = cls()
+        inventory._build(FlightTable.from_frame(df))
+        return inventory
+
+    @classmethod
+    def from_csv(cls, path: str) -> "FlightInventory":
+        return cls.from_frame(pd.read_csv(path, dtype={"flight_number": str}))
+
+    @classmethod
+    def from_parquet(cls, path: str) -> "FlightInventory":
+        return cls.from_frame(pd.read_parquet(path))
+
+
+# ------------------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------------------
+
+AIRPORTS = ["NYC", "LON", "SFO", "LAX", "CHI", "PAR", "TYO", "SEA", "BOS", "MIA"]
+AIRLINES = ["Delta", "United", "JetBlue", "Alaska", "Norse", "BudgetAir"]
+CABINS = ["economy", "premium_economy", "business"]
+
+
+def synthetic_flights(n_rows: int, seed: int = 0) -> List[FlightOption]:
+    rng = random.Random(seed)
+    dates = [(f"2026-05-{d:02d}", f"2026-05-{d + 5:02d}") for d in range(1, 21)]
+
+    flights = []
+    for i in range(n_rows):
+        origin, destination = rng.sample(AIRPORTS, 2)
+        depart_date, return_date = rng.choice(dates)
+        airline = rng.choice(AIRLINES)
+        flights.append(
+            FlightOption(
+                airline=airline,
+                flight_number=f"{airline[:2].upper()}{i}",
+                price=rng.randint(80, 2500),
+                currency="USD",
+                origin=origin,
+                destination=destination,
+                depart_date=depart_date,
+                return_date=return_date,
+                cabin=rng.choice(CABINS),
+                stops=rng.choice([0, 0, 1, 2]),
+            )
+        )
+    return flights
+
+
+def benchmark(n_rows: int = 1_000_000, n_queries: int = 200) -> None:
+    flights = synthetic_flights(n_rows)
+
+    start = time.perf_counter()
+    inventory = FlightInventory(flights)
+    build_s = time.perf_counter() - start
+    print(f"built inventory of {len(inventory)} flights in {build_s:.2f} s")
+
+    rng = random.Random(1)
+    queries = [search_key(rng.choice(flights)) for _ in range(n_queries)]
+
+    # Search + budget filter + cheapest pick, materializing only the winner
+    start = time.perf_counter()
+    for key in queries:
+        matches = inventory.search(*key, max_price=800)
+        if len(matches):
+            matches.record(matches.argmin())
+    indexed_s = time.perf_counter() - start
+
+    # Previous implementation: linear scan + asdict + list filter + full sort
+    scan_queries = queries[:5]
+    start = time.perf_counter()
+    for origin, destination, depart_date, return_date, cabin in scan_queries:
+        matches = [
+            asdict(f)
+            for f in flights
+            if f.origin == origin
+            and f.destination == destination
+            and f.depart_date == depart_date
+            and f.return_date == return_date
+            and f.cabin == cabin
+        ]
+        filtered = [r for r in matches if r["price"] <= 800]
+        if filtered:
+            sorted(filtered, key=lambda x: x["price"])[0]
+    scan_s = time.perf_counter() - start
+
+    indexed_us = indexed_s / len(queries) * 1e6
+    scan_us = scan_s / len(scan_queries) * 1e6
+    print(f"columnar index: {indexed_us:.1f} us/query")
+    print(f"linear scan:    {scan_us:.1f} us/query ({scan_us / indexed_us:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,257 @@
+import re
+import time
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# ------------------------------------------------------------------------------
+# Tables
+# ------------------------------------------------------------------------------
+
+# Year assumed for dates written without one (the demo inventory is 2026)
+DEFAULT_TRAVEL_YEAR = 2026
+DEFAULT_DATES = ("2026-05-10", "2026-05-15")
+
+AIRPORT_ALIASES = {
+    "NYC": ["nyc", "new york", "new york city", "jfk", "lga", "ewr"],
+    "LON": ["london", "lon", "lhr", "heathrow", "gatwick"],
+    "SFO": ["san francisco", "sf", "sfo"],
+    "LAX": ["los angeles", "la", "lax"],
+    "CHI": ["chicago", "chi", "ord"],
+    "PAR": ["paris", "par", "cdg"],
+    "TYO": ["tokyo", "tyo", "nrt", "hnd"],
+    "SEA": ["seattle", "sea"],
+    "BOS": ["boston", "bos"],
+    "MIA": ["miami", "mia"],
+}
+
+MONTH_NAMES = [
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+]
+# Full names, three-letter abbreviations and "sept"
+MONTHS = {
+    **{name: i for i, name in enumerate(MONTH_NAMES, start=1)},
+    **{name[:3]: i for i, name in enumerate(MONTH_NAMES, start=1)},
+    "sept": 9,
+}
+MONTH_ALTERNATIVES = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+# Return date of a query that explicitly asks for a one-way trip
+ONE_WAY = "ONE_WAY"
+ONE_WAY_PATTERN = re.compile(r"\bone[\s-]?way\b")
+
+# Budget syntax shared with flight.extract_budget and the batch scorers
+BUDGET_PATTERN = re.compile(r"under\s*\$?(\d+)", re.IGNORECASE)
+
+
+def _build_alias_trie(aliases: Dict[str, List[str]]) -> Dict[str, Any]:
+    """
+    Word-level trie: each alias is a path of words ending in a "$" leaf
+    holding the airport code.
+    """
+    trie: Dict[str, Any] = {}
+    for code, names in aliases.items():
+        for name in names:
+            node = trie
+            for word in name.split():
+                node = node.setdefault(word, {})
+            node["$"] = code
+    return trie
+
+
+def _trie_to_pattern(node: Dict[str, Any]) -> str:
+    """
+    Compile a word trie into a regex with shared prefixes factored out, so
+    the regex engine walks the trie instead of trying every alias.
+    """
+    branches = []
+    for word in sorted(k for k in node if k != "$"):
+        child = node[word]
+        if any(k != "$" for k in child):
+            tail = r"\s+" + _trie_to_pattern(child)
+            branches.append(re.escape(word) + (f"(?:{tail})?" if "$" in child else tail))
+        else:
+            branches.append(re.escape(word))
+    return "(?:" + "|".join(branches) + ")"
+
+
+ALIAS_TRIE = _build_alias_trie(AIRPORT_ALIASES)
+ALIAS_CODES = {name: code for code, names in AIRPORT_ALIASES.items() for name in names}
+
+# Budgets, dates and places recognized in a single scan; everything else
+# is skipped by the regex engine, which only tries matches at word starts
+TOKEN_PATTERN = re.compile(
+    rf"""
+    \b(?:
+      (?P<budget>under\s*\$?(?P<amount>\d+))
+    | (?P<iso>(?P<iso_year>\d{{4}})-(?P<iso_month>\d{{1,2}})-(?P<iso_day>\d{{1,2}}))
+    | (?P<month_day>
+        (?P<month>{MONTH_ALTERNATIVES})\b\.?\s+
+        (?P<day>\d{{1,2}})(?:st|nd|rd|th)?
+        (?:\s*-\s*(?P<day_end>\d{{1,2}})\b)?
+      )
+    | (?P<slash>(?P<slash_month>\d{{1,2}})/(?P<slash_day>\d{{1,2}}))
+    | (?:(?P<prep>from|to)\s+)?(?P<place>{_trie_to_pattern(ALIAS_TRIE)})\b
+    )
+    """,
+    re.VERBOSE,
+)
+FOLLOWED_BY_TO = re.compile(r"\s+to\b")
+
+
+# ------------------------------------------------------------------------------
+# Parser
+# ------------------------------------------------------------------------------
+
+def _iso_date(year: int, month: int, day: int) -> Optional[str]:
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_constraints(query: str) -> Tuple[Tuple[str, Any], ...]:
+    lower = query.lower()
+    origin = destination = budget = None
+    dates: List[Optional[str]] = []
+
+    for match in TOKEN_PATTERN.finditer(lower):
+        # The enclosing named group of each alternative closes last
+        kind = match.lastgroup
+        if kind == "place":
+            code = ALIAS_CODES[" ".join(match.group("place").split())]
+            prep = match.group("prep")
+            if prep == "from" or (prep is None and FOLLOWED_BY_TO.match(lower, match.end())):
+                origin = origin or code
+            elif prep == "to":
+                destination = destination or code
+        elif kind == "budget":
+            if budget is None:
+                budget = int(match.group("amount"))
+        elif kind == "month_day":
+            month = MONTHS[match.group("month")]
+            day, day_end = match.group("day", "day_end")
+            dates.append(_iso_date(DEFAULT_TRAVEL_YEAR, month, int(day)))
+            if day_end is not None:
+                dates.append(_iso_date(DEFAULT_TRAVEL_YEAR, month, int(day_end)))
+        elif kind == "iso":
+            year, month, day = match.group("iso_year", "iso_month", "iso_day")
+            dates.append(_iso_date(int(year), int(month), int(day)))
+        else:
+            month, day = match.group("slash_month", "slash_day")
+            dates.append(_iso_date(DEFAULT_TRAVEL_YEAR, int(month), int(day)))
+
+    dates = [d for d in dates if d]
+    depart_date = dates[0] if dates else DEFAULT_DATES[0]
+    if ONE_WAY_PATTERN.search(lower):
+        return_date = ONE_WAY
+    elif not dates:
+        return_date = DEFAULT_DATES[1]
+    else:
+        # A single date without "one-way" is a round trip missing its return
+        return_date = dates[1] if len(dates) > 1 else "UNKNOWN"
+
+    return (
+        ("origin", origin or "UNKNOWN"),
+        ("destination", destination or "UNKNOWN"),
+        ("depart_date", depart_date),
+        ("return_date", return_date),
+        ("max_price", budget),
+        ("cabin", "economy"),
+    )
+
+
+def parse_trip_request(query: str) -> Dict[str, Any]:
+    """
+    Parse origin, destination, travel dates and budget from a free-text
+    query. One-way queries get return_date ONE_WAY. Results are memoized
+    per query string; each call returns fresh dicts so callers may mutate
+    them.
+    """
+    constraints = dict(_parse_constraints(query))
+    one_way = constraints["return_date"] == ONE_WAY
+    return {
+        "intent": "book_one_way_flight" if one_way else "book_round_trip_flight",
+        "constraints": constraints,
+    }
+
+
+# ------------------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------------------
+
+def _legacy_parse_trip_request(query: str) -> Dict[str, Any]:
+    """
+    The previous flight.parse_trip_request, kept for benchmarking.
+    """
+    lower = query.lower()
+
+    origin = "NYC" if ("from nyc" in lower or "nyc to" in lower) else "UNKNOWN"
+
+    if "to london" in lower:
+        destination = "LON"
+    elif "to san francisco" in lower or "to sf" in lower or "to sfo" in lower:
+        destination = "SFO"
+    else:
+        destination = "UNKNOWN"
+
+    dates_lower = query.lower()
+    if "may 10" in dates_lower and "may 15" in dates_lower:
+        depart_date, return_date = ("2026-05-10", "2026-05-15")
+    else:
+        depart_date, return_date = ("2026-05-10", "2026-05-15")
+    match = re.search(r"under\s*\$?(\d+)", query.lower())
+    budget = int(match.group(1)) if match else None
+
+    return {
+        "intent": "book_round_trip_flight",
+        "constraints": {
+            "origin": origin,
+            "destination": destination,
+            "depart_date": depart_date,
+            "return_date": return_date,
+            "max_price": budget,
+            "cabin": "economy",
+        },
+    }
+
+
+BENCHMARK_QUERIES = [
+    "Find me a round-trip flight from NYC to London, leaving May 10 and returning May 15, under $800",
+    "Find me a round-trip flight from NYC to San Francisco, leaving May 10 and returning May 15, under $200",
+    "Round trip NYC to SF May 10 - May 15 under $200 please",
+    "I need a flight from NYC to SFO, May 10 to May 15, under 450 dollars",
+]
+
+
+def benchmark(n_calls: int = 100_000) -> None:
+    for query in BENCHMARK_QUERIES:
+        new, old = parse_trip_request(query), _legacy_parse_trip_request(query)
+        if new != old:
+            raise AssertionError(f"parsers disagree on {query!r}: {new} != {old}")
+
+    queries = [BENCHMARK_QUERIES[i % len(BENCHMARK_QUERIES)] for i in range(n_calls)]
+    # Distinct strings defeat the memo and measure the parser itself
+    unique_queries = [f"{q} #{i}" for i, q in enumerate(queries)]
+
+    for label, fn, inputs in [
+        ("legacy", _legacy_parse_trip_request, queries),
+        ("compiled (cold)", parse_trip_request, unique_queries),
+        ("compiled (memoized)", parse_trip_request, queries),
+    ]:
+        _parse_constraints.cache_clear()
+        if label.endswith("(memoized)"):
+            for q in BENCHMARK_QUERIES:
+                fn(q)
+        start = time.perf_counter()
+        for q in inputs:
+            fn(q)
+        elapsed = time.perf_counter() - start
+        print(f"{label:20s} {elapsed / n_calls * 1e6:6.2f} us/query")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,196 @@
+import random
+import time
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from flight import (
+    constraint_adherence,
+    flight_selection_correctness,
+    price_accuracy,
+)
+from flight_parser import BUDGET_PATTERN
+
+
+# ------------------------------------------------------------------------------
+# Column extraction
+# ------------------------------------------------------------------------------
+
+def extract_budgets(queries: Sequence[str]) -> np.ndarray:
+    """
+    Vectorized extract_budget: one regex pass over the whole column,
+    NaN where no budget is stated.
+    """
+    extracted = pd.Series(queries, dtype=object).str.extract(BUDGET_PATTERN, expand=False)
+    return pd.to_numeric(extracted, errors="coerce").to_numpy(dtype=float)
+
+
+def score_columns(
+    inputs: Sequence[Dict[str, Any]],
+    outputs: Sequence[Dict[str, Any]],
+    expectations: Sequence[List[Dict[str, Any]]],
+) -> Dict[str, np.ndarray]:
+    """
+    Flatten evaluation rows into the arrays the batch scorers consume.
+    Missing itineraries / expectations become NaN (prices) or None (airlines).
+    """
+    n_rows = len(outputs)
+    reported_price = np.full(n_rows, np.nan)
+    reported_airline = np.full(n_rows, None, dtype=object)
+    expected_price = np.full(n_rows, np.nan)
+    expected_airline = np.full(n_rows, None, dtype=object)
+
+    for i, (output, expectation) in enumerate(zip(outputs, expectations)):
+        itinerary = output.get("itinerary")
+        if itinerary is not None:
+            reported_price[i] = itinerary["price"]
+            reported_airline[i] = itinerary["airline"]
+        if expectation:
+            price = expectation[0].get("expected_price")
+            if price is not None:
+                expected_price[i] = price
+            expected_airline[i] = expectation[0].get("expected_airline")
+
+    return {
+        "budget": extract_budgets([row["query"] for row in inputs]),
+        "reported_price": reported_price,
+        "reported_airline": reported_airline,
+        "expected_price": expected_price,
+        "expected_airline": expected_airline,
+    }
+
+
+# ------------------------------------------------------------------------------
+# Batch scorers
+# ------------------------------------------------------------------------------
+
+def batch_constraint_adherence(reported_price: np.ndarray, budget: np.ndarray) -> np.ndarray:
+    # NaN comparisons are False, so missing budgets / itineraries score 0
+    return (reported_price <= budget).astype(float)
+
+
+def batch_price_accuracy(reported_price: np.ndarray, expected_price: np.ndarray) -> np.ndarray:
+    delta = np.abs(reported_price - expected_price)
+    with np.errstate(invalid="ignore"):
+        scores = np.maximum(0.0, 1.0 - delta / np.maximum(expected_price, 1))
+    scores[reported_price == expected_price] = 1.0
+    return np.nan_to_num(scores, nan=0.0)
+
+
+def batch_flight_selection_correctness(
+    reported_airline: np.ndarray,
+    expected_airline: np.ndarray,
+) -> np.ndarray:
+    valid = pd.notna(reported_airline) & pd.notna(expected_airline)
+    return (valid & (reported_airline == expected_airline)).astype(float)
+
+
+def batch_score(
+    inputs: Sequence[Dict[str, Any]],
+    outputs: Sequence[Dict[str, Any]],
+    expectations: Sequence[List[Dict[str, Any]]],
+) -> tuple[Dict[str, np.ndarray], Dict[str, float]]:
+    """
+    Per-row scores for all three flight scorers plus their aggregates.
+    """
+    columns = score_columns(inputs, outputs, expectations)
+    scores = {
+        "constraint_adherence": batch_constraint_adherence(
+            columns["reported_price"], columns["budget"]
+        ),
+        "price_accuracy": batch_price_accuracy(
+            columns["reported_price"], columns["expected_price"]
+        ),
+        "flight_selection_correctness": batch_flight_selection_correctness(
+            columns["reported_airline"], columns["expected_airline"]
+        ),
+    }
+
+    aggregates = {}
+    for name, values in scores.items():
+        aggregates[f"{name}/mean"] = float(values.mean()) if len(values) else 0.0
+        aggregates[f"{name}/pass_rate"] = float((values == 1.0).mean()) if len(values) else 0.0
+    return scores, aggregates
+
+
+PER_ROW_SCORERS = {
+    "constraint_adherence": constraint_adherence,
+    "price_accuracy": price_accuracy,
+    "flight_selection_correctness": flight_selection_correctness,
+}
+
+
+def per_row_score(
+    inputs: Sequence[Dict[str, Any]],
+    outputs: Sequence[Dict[str, Any]],
+    expectations: Sequence[List[Dict[str, Any]]],
+) -> Dict[str, np.ndarray]:
+    scores = {name: np.empty(len(outputs)) for name in PER_ROW_SCORERS}
+    for i, row in enumerate(zip(inputs, outputs, expectations)):
+        for name, scorer in PER_ROW_SCORERS.items():
+            scores[name][i] = scorer(inputs=row[0], outputs=row[1], expectations=row[2])
+    return scores
+
+
+# ------------------------------------------------------------------------------
+# Equivalence check and benchmark
+# ------------------------------------------------------------------------------
+
+def synthetic_rows(n_rows: int, seed: int = 0):
+    rng = random.Random(seed)
+    airlines = ["Delta", "United", "Norse", "Alaska", "JetBlue"]
+
+    inputs, outputs, expectations = [], [], []
+    for _ in range(n_rows):
+        budget = rng.choice([None, rng.randrange(100, 1000, 10)])
+        query = "Flight from NYC to London" + (f" under ${budget}" if budget else "")
+        inputs.append({"query": query})
+
+        if rng.random() < 0.1:
+            outputs.append({"itinerary": None})
+        else:
+            outputs.append({"itinerary": {"airline": rng.choice(airlines), "price": rng.randrange(50, 1100)}})
+
+        roll = rng.random()
+        if roll < 0.05:
+            expectations.append([])
+        elif roll < 0.1:
+            expectations.append([{"expected_airline": None, "expected_price": None}])
+        else:
+            expectations.append([{
+                "expected_airline": rng.choice(airlines),
+                "expected_price": rng.choice([0, rng.randrange(50, 1100)]),
+            }])
+    return inputs, outputs, expectations
+
+
+def check_equivalence(n_rows: int = 10_000) -> None:
+    rows = synthetic_rows(n_rows, seed=1)
+    expected = per_row_score(*rows)
+    actual, _ = batch_score(*rows)
+    for name in PER_ROW_SCORERS:
+        mismatches = np.flatnonzero(~np.isclose(expected[name], actual[name]))
+        if len(mismatches):
+            raise AssertionError(f"{name} differs from the per-row scorer at rows {mismatches[:10].tolist()}")
+
+
+def benchmark(n_rows: int = 100_000) -> None:
+    check_equivalence()
+    rows = synthetic_rows(n_rows)
+
+    start = time.perf_counter()
+    per_row_score(*rows)
+    per_row_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, aggregates = batch_score(*rows)
+    batch_s = time.perf_counter() - start
+
+    print(f"per-row scorers: {per_row_s:.2f} s ({n_rows / per_row_s:,.0f} rows/s)")
+    print(f"batch scorers:   {batch_s:.3f} s ({n_rows / batch_s:,.0f} rows/s, {per_row_s / batch_s:.0f}x)")
+    print(aggregates)
+
+
+if __name__ == "__main__":
+    benchmark()
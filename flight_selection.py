@@ -0,0 +1,172 @@
+import heapq
+import itertools
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Union
+
+import numpy as np
+
+from flight_inventory import FlightTable, synthetic_flights
+
+
+# ------------------------------------------------------------------------------
+# Criteria
+# ------------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class SelectionCriteria:
+    """
+    Weighted cost of a flight, lower is better:
+
+        price_weight * price + stop_penalty * stops + airline_penalties[airline]
+
+    Penalties are in price units, e.g. stop_penalty=75 trades one stop
+    for $75. Airlines missing from airline_penalties cost default_airline_penalty.
+    """
+
+    price_weight: float = 1.0
+    stop_penalty: float = 0.0
+    airline_penalties: Dict[str, float] = field(default_factory=dict)
+    default_airline_penalty: float = 0.0
+
+    @classmethod
+    def from_airline_order(
+        cls,
+        preferred: Sequence[str],
+        step: float = 1e6,
+        **kwargs: Any,
+    ) -> "SelectionCriteria":
+        """
+        Criteria ranking airlines by position in preferred first; with a
+        step larger than any price this is a strict airline-then-price order.
+        """
+        return cls(
+            airline_penalties={airline: i * step for i, airline in enumerate(preferred)},
+            default_airline_penalty=len(preferred) * step,
+            **kwargs,
+        )
+
+    @property
+    def price_only(self) -> bool:
+        return (
+            self.stop_penalty == 0.0
+            and self.default_airline_penalty == 0.0
+            and not any(self.airline_penalties.values())
+        )
+
+
+CHEAPEST = SelectionCriteria()
+
+
+def score_table(table: FlightTable, criteria: SelectionCriteria) -> np.ndarray:
+    scores = criteria.price_weight * table.columns["price"].astype(np.float64)
+    if criteria.stop_penalty:
+        scores += criteria.stop_penalty * table.columns["stops"]
+    if criteria.airline_penalties or criteria.default_airline_penalty:
+        # One lookup per airline category rather than per row
+        penalty_by_code = np.array(
+            [
+                criteria.airline_penalties.get(airline, criteria.default_airline_penalty)
+                for airline in table.categories["airline"]
+            ],
+            dtype=np.float64,
+        )
+        scores += penalty_by_code[table.columns["airline"]]
+    return scores
+
+
+# ------------------------------------------------------------------------------
+# Streaming top-k
+# ------------------------------------------------------------------------------
+
+@dataclass
+class RankedFlight:
+    score: float
+    flight: Dict[str, Any]
+
+
+def iter_chunks(table: FlightTable, chunk_size: int) -> Iterator[FlightTable]:
+    for start in range(0, len(table), chunk_size):
+        yield table[start:start + chunk_size]
+
+
+def select_top_k(
+    results: Union[FlightTable, Iterable[FlightTable]],
+    k: int,
+    criteria: SelectionCriteria = CHEAPEST,
+) -> List[RankedFlight]:
+    """
+    The k lowest-cost flights across a table or a stream of tables, best
+    first; ties keep arrival order.
+
+    Each chunk is scored vectorized and cut to its own top k, and the
+    survivors go through a bounded heap, so memory stays O(k) and only
+    the final k rows are turned into dicts.
+    """
+    if k <= 0:
+        return []
+    if isinstance(results, FlightTable):
+        results = [results]
+
+    # Max-heap via negation; (-score, -seq) evicts the latest of equal scores
+    heap: List[tuple] = []
+    seq = itertools.count()
+    for table in results:
+        if not len(table):
+            continue
+        scores = score_table(table, criteria)
+        # Price-only criteria on a price-sorted table: the first k rows
+        rows = table.top_k(k, None if criteria.price_only and criteria.price_weight > 0 else scores)
+        for row in rows.tolist():
+            item = (-scores[row], -next(seq), table, row)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+
+    ranked = sorted(heap, key=lambda item: item[:2], reverse=True)
+    return [RankedFlight(float(-neg_score), table.record(row)) for neg_score, _, table, row in ranked]
+
+
+# ------------------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------------------
+
+def benchmark(n_rows: int = 1_000_000, k: int = 10, chunk_size: int = 65_536) -> None:
+    table = FlightTable.from_flights(synthetic_flights(n_rows))
+    rng = random.Random(0)
+    criteria = SelectionCriteria(
+        stop_penalty=75.0,
+        airline_penalties={airline: rng.choice([0.0, 50.0, 150.0]) for airline in table.categories["airline"]},
+    )
+
+    start = time.perf_counter()
+    streamed = select_top_k(iter_chunks(table, chunk_size), k, criteria)
+    stream_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = score_table(table, criteria)
+    order = np.argsort(scores, kind="stable")[:k]
+    full_sort_s = time.perf_counter() - start
+
+    records = table.to_records()
+    start = time.perf_counter()
+    penalty = criteria.airline_penalties
+    by_python = sorted(
+        records,
+        key=lambda r: r["price"] + criteria.stop_penalty * r["stops"] + penalty.get(r["airline"], 0.0),
+    )[:k]
+    python_s = time.perf_counter() - start
+
+    if [r.flight for r in streamed] != [table.record(i) for i in order.tolist()] or \
+            [r.flight for r in streamed] != by_python:
+        raise AssertionError("streaming top-k disagrees with a full sort")
+
+    print(f"streaming top-{k} ({chunk_size}-row chunks): {stream_s * 1e3:7.1f} ms")
+    print(f"vectorized full sort:                 {full_sort_s * 1e3:7.1f} ms")
+    print(f"python sort over dicts:               {python_s * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,249 @@
+import functools
+import inspect
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import mlflow
+
+from flight_inventory import FlightTable
+
+
+# ------------------------------------------------------------------------------
+# Policy
+# ------------------------------------------------------------------------------
+
+FULL = "full"
+SUMMARY = "summary"
+OFF = "off"
+
+
+@dataclass(frozen=True)
+class TracingPolicy:
+    """
+    How much the flight tools trace.
+
+    mode: "full" logs complete inputs/outputs, "summary" applies per-tool
+        summaries and truncation, "off" skips span creation entirely.
+    sample_rate: fraction of root calls (usually agents) that are traced;
+        nested tool calls follow their root's decision.
+    max_items / max_chars: truncation limits applied in summary mode.
+    """
+
+    mode: str = FULL
+    sample_rate: float = 1.0
+    max_items: int = 3
+    max_chars: int = 500
+
+    def __post_init__(self):
+        if self.mode not in (FULL, SUMMARY, OFF):
+            raise ValueError(f"Unknown tracing mode '{self.mode}'")
+        if not 0.0 <= self.sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+
+
+_policy: ContextVar[TracingPolicy] = ContextVar(
+    "flight_tracing_policy",
+    default=TracingPolicy(
+        mode=os.getenv("FLIGHT_TRACING_MODE", FULL),
+        sample_rate=float(os.getenv("FLIGHT_TRACE_SAMPLE_RATE", "1.0")),
+    ),
+)
+
+# Sampling decision of the enclosing root call, None outside any traced call
+_sampled: ContextVar[Optional[bool]] = ContextVar("flight_trace_sampled", default=None)
+
+
+def get_tracing_policy() -> TracingPolicy:
+    return _policy.get()
+
+
+def set_tracing_policy(policy: TracingPolicy) -> None:
+    _policy.set(policy)
+
+
+@contextmanager
+def tracing_policy(policy: TracingPolicy) -> Iterator[TracingPolicy]:
+    token = _policy.set(policy)
+    try:
+        yield policy
+    finally:
+        _policy.reset(token)
+
+
+# ------------------------------------------------------------------------------
+# Payload summaries
+# ------------------------------------------------------------------------------
+
+def _truncate(value: Any, policy: TracingPolicy) -> Any:
+    if isinstance(value, FlightTable):
+        return {"result_count": len(value)}
+    if isinstance(value, dict):
+        return {k: _truncate(v, policy) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [_truncate(v, policy) for v in value[:policy.max_items]]
+        if len(value) > policy.max_items:
+            items.append(f"... {len(value) - policy.max_items} more")
+        return items
+    if isinstance(value, str) and len(value) > policy.max_chars:
+        return value[:policy.max_chars] + f"... [{len(value) - policy.max_chars} chars truncated]"
+    return value
+
+
+def _expand(value: Any) -> Any:
+    if isinstance(value, FlightTable):
+        return value.to_records()
+    if isinstance(value, dict):
+        return {k: _expand(v) for k, v in value.items()}
+    return value
+
+
+def without(*keys: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Summary that drops bulky keys from a payload dict, e.g. without("results")
+    when the payload already carries a result count.
+    """
+    def summarize(payload: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(payload, dict):
+            return payload
+        return {k: v for k, v in payload.items() if k not in keys}
+
+    return summarize
+
+
+# ------------------------------------------------------------------------------
+# Decorator
+# ------------------------------------------------------------------------------
+
+def traced(
+    name: str,
+    summarize_inputs: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    summarize_outputs: Optional[Callable[[Any], Any]] = None,
+):
+    """
+    Policy-aware replacement for @mlflow.trace(name=...), for plain and
+    async functions. The summarize_* hooks shape the span payloads in
+    summary mode before truncation.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        def record(payload: Any, summarize: Optional[Callable], policy: TracingPolicy) -> Any:
+            if policy.mode == FULL:
+                return _expand(payload)
+            if summarize is not None:
+                payload = summarize(payload)
+            return _truncate(payload, policy)
+
+        def sample(policy: TracingPolicy) -> bool:
+            # Head-based sampling: decided once at the root call
+            return policy.mode != OFF and (
+                policy.sample_rate >= 1.0 or random.random() < policy.sample_rate
+            )
+
+        def start_span(policy: TracingPolicy, args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            span_cm = mlflow.start_span(name=name)
+            span = span_cm.__enter__()
+            span.set_inputs(record(dict(bound.arguments), summarize_inputs, policy))
+            return span_cm, span
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                policy = _policy.get()
+                sampled = _sampled.get()
+                if sampled is None:
+                    token = _sampled.set(sample(policy))
+                    try:
+                        return await async_wrapper(*args, **kwargs)
+                    finally:
+                        _sampled.reset(token)
+
+                if not sampled:
+                    return await fn(*args, **kwargs)
+
+                span_cm, span = start_span(policy, args, kwargs)
+                try:
+                    result = await fn(*args, **kwargs)
+                    span.set_outputs(record(result, summarize_outputs, policy))
+                except BaseException as exc:
+                    span_cm.__exit__(type(exc), exc, exc.__traceback__)
+                    raise
+                span_cm.__exit__(None, None, None)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            policy = _policy.get()
+            sampled = _sampled.get()
+            if sampled is None:
+                token = _sampled.set(sample(policy))
+                try:
+                    return wrapper(*args, **kwargs)
+                finally:
+                    _sampled.reset(token)
+
+            if not sampled:
+                return fn(*args, **kwargs)
+
+            span_cm, span = start_span(policy, args, kwargs)
+            try:
+                result = fn(*args, **kwargs)
+                span.set_outputs(record(result, summarize_outputs, policy))
+            except BaseException as exc:
+                span_cm.__exit__(type(exc), exc, exc.__traceback__)
+                raise
+            span_cm.__exit__(None, None, None)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+# ------------------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------------------
+
+BENCHMARK_POLICIES = [
+    TracingPolicy(mode=OFF),
+    TracingPolicy(mode=SUMMARY, sample_rate=0.01),
+    TracingPolicy(mode=SUMMARY, sample_rate=0.1),
+    TracingPolicy(mode=SUMMARY),
+    TracingPolicy(mode=FULL),
+]
+
+
+def benchmark(n_calls: int = 2000) -> None:
+    from flight import flight_agent_good
+
+    sample = {
+        "query": (
+            "Find me a round-trip flight from NYC to London, "
+            "leaving May 10 and returning May 15, under $800"
+        )
+    }
+
+    for policy in BENCHMARK_POLICIES:
+        with tracing_policy(policy):
+            flight_agent_good(sample)
+            start = time.perf_counter()
+            for _ in range(n_calls):
+                flight_agent_good(sample)
+            elapsed = time.perf_counter() - start
+        print(
+            f"mode={policy.mode:7s} sample_rate={policy.sample_rate:<5} "
+            f"{n_calls / elapsed:10,.0f} agent calls/s"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,469 @@
+import gzip
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+    ExportTraceServiceRequest,
+    ExportTraceServiceResponse,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+import agent_telemetry
+from config import settings
+
+
+# ------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------
+
+# agent.run, agent.plan, tool.weather_lookup, model.generate
+SPANS_PER_TRACE = 4
+
+# Size of the padded user query, which is repeated in user.query, the root
+# span inputs and the LLM span inputs
+PAYLOAD_SIZES = (256, 4096, 65536)
+
+PERCENTILES = {"p50": 50, "p95": 95, "p99": 99}
+
+CITIES = ("New York", "London", "Tokyo", "Paris", "Sydney")
+
+
+# ------------------------------------------------------------------------------
+# Synthetic agent
+# ------------------------------------------------------------------------------
+
+def synthetic_query(size: int, rng: random.Random) -> str:
+    prefix = "What is the weather like today? "
+    filler = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz ", k=max(size - len(prefix), 0)))
+    return prefix + filler
+
+
+def synthetic_planner(user_query: str) -> Dict[str, Any]:
+    return {
+        "goal": "answer user question",
+        "steps": ["understand request", "call weather tool", "summarize result"],
+        "query": user_query,
+    }
+
+
+def synthetic_weather_tool(city: str) -> Dict[str, Any]:
+    return {"city": city, "forecast": "sunny", "temperature_f": 70}
+
+
+def synthetic_generate(plan: Dict[str, Any], tool_result: Dict[str, Any]) -> str:
+    return (
+        f"The weather in {tool_result['city']} looks {tool_result['forecast']} "
+        f"at about {tool_result['temperature_f']}°F. "
+        f"Plan steps were: {', '.join(plan['steps'])}."
+    )
+
+
+def synthetic_agent(tracer, user_query: str, city: str) -> str:
+    """
+    agent_telemetry.run_agent with the same span tree and attributes,
+    minus the sleeps in the fake agent pieces.
+    """
+    return agent_telemetry.run_agent(
+        user_query,
+        city,
+        planner=synthetic_planner,
+        weather_tool=synthetic_weather_tool,
+        generate=synthetic_generate,
+        agent_tracer=tracer,
+    )
+
+
+# ------------------------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------------------------
+
+class TimedExporter(SpanExporter):
+    """
+    Records the wall time and outcome of every export call of the wrapped
+    exporter. For OTLPSpanExporter that is one ingest request: protobuf
+    encoding, compression, the round trip and the exporter's own retries
+    on 429/502/503/504.
+    """
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+        self._lock = threading.Lock()
+        self.latencies_s: List[float] = []
+        self.spans_exported = 0
+        self.spans_failed = 0
+        self.failed_exports = 0
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        start = time.perf_counter()
+        try:
+            result = self.exporter.export(spans)
+        except Exception:
+            result = SpanExportResult.FAILURE
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.latencies_s.append(elapsed)
+            if result is SpanExportResult.SUCCESS:
+                self.spans_exported += len(spans)
+            else:
+                self.spans_failed += len(spans)
+                self.failed_exports += 1
+        return result
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
+
+
+# ------------------------------------------------------------------------------
+# In-process stand-in for the ingest service
+# ------------------------------------------------------------------------------
+
+class StandInIngest:
+    """
+    Minimal OTLP/HTTP protobuf endpoint on localhost: checks the ingest key
+    and body limit like the real service, decodes the request and counts
+    spans. latency_s and error_rate simulate a slow or failing backend;
+    injected errors are HTTP 500, which the exporter does not retry.
+    """
+
+    def __init__(
+        self,
+        ingest_key: str = "super-secret",
+        latency_s: float = 0.0,
+        error_rate: float = 0.0,
+        max_body_bytes: int = settings.MAX_BODY_BYTES,
+        seed: Optional[int] = None,
+    ):
+        self.ingest_key = ingest_key
+        self.latency_s = latency_s
+        self.error_rate = error_rate
+        self.max_body_bytes = max_body_bytes
+        self._rng = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.spans = 0
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+        self.status_counts: Dict[int, int] = {}
+
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/traces"
+
+    def _handle(self, headers, body: bytes) -> tuple[int, bytes]:
+        if headers.get("x-ingest-key") != self.ingest_key:
+            return 401, b""
+        if len(body) > self.max_body_bytes:
+            return 413, b""
+        if headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        request = ExportTraceServiceRequest()
+        request.ParseFromString(body)
+        n_spans = sum(len(ss.spans) for rs in request.resource_spans for ss in rs.scope_spans)
+
+        with self._lock:
+            self.spans += n_spans
+            self.bytes_decoded += len(body)
+            failed = self._rng.random() < self.error_rate
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if failed:
+            return 500, b""
+        return 200, ExportTraceServiceResponse().SerializeToString()
+
+    def _handler_class(self) -> type:
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stand_in._lock:
+                    stand_in.requests += 1
+                    stand_in.bytes_received += len(body)
+                try:
+                    status, payload = stand_in._handle(self.headers, body)
+                except Exception:
+                    status, payload = 400, b""
+                with stand_in._lock:
+                    stand_in.status_counts[status] = stand_in.status_counts.get(status, 0) + 1
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/x-protobuf")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StandInIngest":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="ingest-stand-in", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "spans": self.spans,
+                "bytes_received": self.bytes_received,
+                "bytes_decoded": self.bytes_decoded,
+                "status_counts": dict(self.status_counts),
+            }
+
+
+@contextmanager
+def stand_in_ingest(**kwargs) -> Iterator[StandInIngest]:
+    stand_in = StandInIngest(**kwargs).start()
+    try:
+        yield stand_in
+    finally:
+        stand_in.stop()
+
+
+# ------------------------------------------------------------------------------
+# Load
+# ------------------------------------------------------------------------------
+
+def _agent_loop(
+    tracer,
+    interval_s: float,
+    start: float,
+    deadline: float,
+    payload_sizes: Sequence[int],
+    seed: int,
+    counts: Dict[str, int],
+    lock: threading.Lock,
+) -> None:
+    rng = random.Random(seed)
+    # Pre-built queries so payload generation is not part of the paced loop
+    queries = {size: synthetic_query(size, rng) for size in payload_sizes}
+
+    # Stagger agents across the first interval instead of firing together
+    next_at = start + rng.random() * interval_s
+    traces = errors = late = 0
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        if next_at > now:
+            time.sleep(min(next_at - now, deadline - now))
+            continue
+
+        try:
+            synthetic_agent(tracer, queries[rng.choice(payload_sizes)], rng.choice(CITIES))
+            traces += 1
+        except Exception:
+            errors += 1
+
+        next_at += interval_s
+        # Too far behind to catch up: drop the backlog rather than burst
+        if time.perf_counter() - next_at > interval_s:
+            late += 1
+            next_at = time.perf_counter()
+
+    with lock:
+        counts["traces"] += traces
+        counts["agent_errors"] += errors
+        counts["late"] += late
+
+
+def run_load(
+    endpoint: Optional[str] = None,
+    agents: int = 8,
+    spans_per_sec: float = 2000.0,
+    duration_s: float = 10.0,
+    payload_sizes: Sequence[int] = PAYLOAD_SIZES,
+    headers: Optional[Dict[str, str]] = None,
+    stand_in_latency_s: float = 0.0,
+    stand_in_error_rate: float = 0.0,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Drive `agents` concurrent synthetic agents at a combined target of
+    spans_per_sec for duration_s seconds and export through the client's
+    BatchSpanProcessor settings. Without an endpoint the spans go to a
+    StandInIngest on localhost.
+
+    Spans that were generated but neither exported nor failed were dropped
+    by a full processor queue.
+    """
+    headers = headers or {"x-project-name": "loadgen-project", "x-ingest-key": "super-secret"}
+
+    with nullcontext() if endpoint else stand_in_ingest(
+        ingest_key=headers.get("x-ingest-key"),
+        latency_s=stand_in_latency_s,
+        error_rate=stand_in_error_rate,
+        seed=seed,
+    ) as stand_in:
+        exporter = TimedExporter(
+            OTLPSpanExporter(
+                endpoint=endpoint or stand_in.endpoint,
+                headers=headers,
+                timeout=agent_telemetry.OTLP_TIMEOUT_SECONDS,
+                compression=agent_telemetry.OTLP_COMPRESSION,
+            )
+        )
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": "ingest-loadgen"}),
+            shutdown_on_exit=False,
+        )
+        provider.add_span_processor(
+            BatchSpanProcessor(
+                exporter,
+                max_queue_size=agent_telemetry.BSP_MAX_QUEUE_SIZE,
+                schedule_delay_millis=agent_telemetry.BSP_SCHEDULE_DELAY_MILLIS,
+                max_export_batch_size=agent_telemetry.BSP_MAX_EXPORT_BATCH_SIZE,
+                export_timeout_millis=agent_telemetry.BSP_EXPORT_TIMEOUT_MILLIS,
+            )
+        )
+        tracer = provider.get_tracer("ingest.loadgen")
+
+        interval_s = SPANS_PER_TRACE * agents / spans_per_sec
+        counts = {"traces": 0, "agent_errors": 0, "late": 0}
+        lock = threading.Lock()
+
+        start = time.perf_counter()
+        deadline = start + duration_s
+        threads = [
+            threading.Thread(
+                target=_agent_loop,
+                args=(tracer, interval_s, start, deadline, payload_sizes, seed + i, counts, lock),
+                name=f"loadgen-agent-{i}",
+            )
+            for i in range(agents)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        flushed = provider.force_flush(agent_telemetry.SHUTDOWN_TIMEOUT_MILLIS)
+        provider.shutdown()
+        drain_s = time.perf_counter() - start - elapsed
+
+        spans_generated = counts["traces"] * SPANS_PER_TRACE
+        latencies_ms = np.asarray(exporter.latencies_s, dtype=float) * 1e3
+        n_exports = len(latencies_ms)
+
+        report: Dict[str, Any] = {
+            "agents": agents,
+            "target_spans_per_sec": spans_per_sec,
+            "achieved_spans_per_sec": spans_generated / elapsed,
+            "duration_s": elapsed,
+            "drain_s": drain_s,
+            "flushed": flushed,
+            "traces": counts["traces"],
+            "agent_errors": counts["agent_errors"],
+            "late_agents": counts["late"],
+            "spans_generated": spans_generated,
+            "spans_exported": exporter.spans_exported,
+            "spans_failed": exporter.spans_failed,
+            "spans_dropped": max(spans_generated - exporter.spans_exported - exporter.spans_failed, 0),
+            "exports": n_exports,
+            "failed_exports": exporter.failed_exports,
+            "export_error_rate": exporter.failed_exports / n_exports if n_exports else 0.0,
+            "span_loss_rate": (
+                (spans_generated - exporter.spans_exported) / spans_generated if spans_generated else 0.0
+            ),
+            "latency_ms": {
+                **{name: float(np.percentile(latencies_ms, q)) for name, q in PERCENTILES.items()},
+                "max": float(latencies_ms.max()),
+            }
+            if n_exports
+            else {},
+        }
+        if stand_in is not None:
+            report["stand_in"] = stand_in.stats()
+        return report
+
+
+# ------------------------------------------------------------------------------
+# Report
+# ------------------------------------------------------------------------------
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"{report['agents']} agents, target {report['target_spans_per_sec']:.0f} spans/s, "
+        f"achieved {report['achieved_spans_per_sec']:.0f} spans/s over {report['duration_s']:.1f}s "
+        f"(+{report['drain_s']:.2f}s drain{'' if report['flushed'] else ', flush timed out'})"
+    )
+    print(
+        f"spans: {report['spans_generated']} generated, {report['spans_exported']} exported, "
+        f"{report['spans_failed']} failed, {report['spans_dropped']} dropped"
+    )
+    print(
+        f"exports: {report['exports']} requests, {report['failed_exports']} failed "
+        f"({report['export_error_rate']:.2%}); span loss rate {report['span_loss_rate']:.2%}"
+    )
+    if report["latency_ms"]:
+        print("ingest latency ms: " + "  ".join(f"{k}={v:.1f}" for k, v in report["latency_ms"].items()))
+    if report["late_agents"]:
+        print(f"warning: agents fell behind the target rate {report['late_agents']} times")
+    if "stand_in" in report:
+        stats = report["stand_in"]
+        print(
+            f"stand-in: {stats['requests']} requests, {stats['spans']} spans, "
+            f"{stats['bytes_received'] / 1e6:.1f} MB on the wire, "
+            f"{stats['bytes_decoded'] / 1e6:.1f} MB decoded, status {stats['status_counts']}"
+        )
+
+
+def main(
+    endpoint: Optional[str] = os.getenv("LOADGEN_ENDPOINT"),
+    agents: int = int(os.getenv("LOADGEN_AGENTS", "8")),
+    spans_per_sec: float = float(os.getenv("LOADGEN_SPANS_PER_SEC", "2000")),
+    duration_s: float = float(os.getenv("LOADGEN_DURATION", "10")),
+    payload_sizes: str = os.getenv("LOADGEN_PAYLOAD_SIZES", ",".join(map(str, PAYLOAD_SIZES))),
+    ingest_key: str = os.getenv("LOADGEN_INGEST_KEY", "super-secret"),
+    stand_in_latency_ms: float = float(os.getenv("LOADGEN_STAND_IN_LATENCY_MS", "0")),
+    stand_in_error_rate: float = float(os.getenv("LOADGEN_STAND_IN_ERROR_RATE", "0")),
+) -> None:
+    """
+    Run one load level and print the report. Without LOADGEN_ENDPOINT the
+    in-process stand-in receives the spans.
+    """
+    report = run_load(
+        endpoint=endpoint or None,
+        agents=agents,
+        spans_per_sec=spans_per_sec,
+        duration_s=duration_s,
+        payload_sizes=[int(size) for size in payload_sizes.split(",")],
+        headers={"x-project-name": "loadgen-project", "x-ingest-key": ingest_key},
+        stand_in_latency_s=stand_in_latency_ms / 1e3,
+        stand_in_error_rate=stand_in_error_rate,
+    )
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
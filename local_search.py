@@ -0,0 +1,395 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from parser import (
+    ast_to_query,
+    parse_filter_expression,
+    parse_order_by_clause,
+)
+
+
+# ------------------------------------------------------------------------------
+# Column resolution
+# ------------------------------------------------------------------------------
+
+# Top-level fields that mlflow.search_runs exposes under a different column
+TOP_LEVEL_COLUMN_FALLBACKS = {
+    "user_id": "tags.mlflow.user",
+}
+
+# attributes.<key> refers to a run attribute, which mlflow.search_runs
+# returns as a top-level column rather than as attributes.<key>
+ATTRIBUTE_COLUMNS = {
+    "run_id": "run_id",
+    "experiment_id": "experiment_id",
+    "user_id": "user_id",
+    "status": "status",
+    "start_time": "start_time",
+    "end_time": "end_time",
+    "artifact_uri": "artifact_uri",
+    "run_name": "tags.mlflow.runName",
+}
+
+RANGE_OPS = {
+    "gt": np.greater,
+    "gte": np.greater_equal,
+    "lt": np.less,
+    "lte": np.less_equal,
+}
+
+Mask = Callable[["_FrameView"], np.ndarray]
+
+
+def run_table_column(path: str, key: str) -> str:
+    """
+    Column of a mlflow.search_runs DataFrame holding `path`.`key`, e.g.
+    metrics.accuracy or, for attributes.status, the top-level status column.
+    """
+    if path != "attributes":
+        return f"{path}.{key}"
+    column = ATTRIBUTE_COLUMNS.get(key)
+    if column is None:
+        raise ValueError(
+            f"Unknown run attribute 'attributes.{key}'; expected one of {', '.join(sorted(ATTRIBUTE_COLUMNS))}."
+        )
+    return column
+
+
+class _FrameView:
+    """
+    Per-evaluation view over a run table that memoizes column conversions,
+    so a filter touching the same column several times converts it once.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.n_rows = len(df)
+        self._numeric: Dict[str, np.ndarray] = {}
+
+    def column(self, name: str) -> Optional[pd.Series]:
+        if name in self.df.columns:
+            return self.df[name]
+        fallback = TOP_LEVEL_COLUMN_FALLBACKS.get(name)
+        if fallback is not None and fallback in self.df.columns:
+            return self.df[fallback]
+        return None
+
+    def numeric(self, name: str) -> Optional[np.ndarray]:
+        if name not in self._numeric:
+            series = self.column(name)
+            if series is None:
+                return None
+            if pd.api.types.is_datetime64_any_dtype(series):
+                # start_time / end_time are compared as epoch milliseconds
+                values = series.dt.tz_localize(None) if series.dt.tz is not None else series
+                values = values.astype("datetime64[ms]").astype("int64").to_numpy(dtype=float)
+                values[series.isna().to_numpy()] = np.nan
+            elif pd.api.types.is_numeric_dtype(series):
+                values = series.to_numpy(dtype=float, na_value=np.nan)
+            else:
+                # Params and tags are strings with few distinct values:
+                # convert the uniques once and broadcast back via the codes
+                codes, uniques = pd.factorize(series)
+                unique_values = pd.to_numeric(pd.Series(uniques), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+                values = np.append(unique_values, np.nan)[codes]
+            self._numeric[name] = values
+        return self._numeric[name]
+
+    def nothing(self) -> np.ndarray:
+        return np.zeros(self.n_rows, dtype=bool)
+
+
+# ------------------------------------------------------------------------------
+# Query DSL -> vectorized mask
+#
+# Masks are compiled from the DSL produced by parser.ast_to_query rather than
+# from the raw AST, so the local and OpenSearch paths share validation and
+# cannot drift apart semantically.
+# ------------------------------------------------------------------------------
+
+def _term_mask(column: str, value: Any) -> Mask:
+    def evaluate(view: _FrameView) -> np.ndarray:
+        series = view.column(column)
+        if series is None:
+            return view.nothing()
+        if pd.api.types.is_bool_dtype(series):
+            # Boolean params are indexed as "True" / "False"
+            return series.to_numpy(dtype=object).astype(str) == str(value)
+        if not (
+            pd.api.types.is_numeric_dtype(series)
+            or pd.api.types.is_datetime64_any_dtype(series)
+        ):
+            return (series == str(value)).to_numpy(dtype=bool, na_value=False)
+        try:
+            numeric_value = float(value)
+        except (TypeError, ValueError):
+            return view.nothing()
+        return view.numeric(column) == numeric_value
+
+    return evaluate
+
+
+def _range_mask(column: str, bounds: Dict[str, float]) -> Mask:
+    def evaluate(view: _FrameView) -> np.ndarray:
+        values = view.numeric(column)
+        if values is None:
+            return view.nothing()
+        mask = ~np.isnan(values)
+        for op, bound in bounds.items():
+            mask &= RANGE_OPS[op](values, bound)
+        return mask
+
+    return evaluate
+
+
+def _all_of(masks: List[Mask]) -> Mask:
+    def evaluate(view: _FrameView) -> np.ndarray:
+        result = np.ones(view.n_rows, dtype=bool)
+        for mask in masks:
+            result &= mask(view)
+        return result
+
+    return evaluate
+
+
+def _any_of(masks: List[Mask], minimum_should_match: int) -> Mask:
+    def evaluate(view: _FrameView) -> np.ndarray:
+        if minimum_should_match <= 1:
+            result = view.nothing()
+            for mask in masks:
+                result |= mask(view)
+            return result
+        counts = np.zeros(view.n_rows, dtype=np.int32)
+        for mask in masks:
+            counts += mask(view)
+        return counts >= minimum_should_match
+
+    return evaluate
+
+
+def _none_of(masks: List[Mask]) -> Mask:
+    matched = _any_of(masks, 1)
+    return lambda view: ~matched(view)
+
+
+def _key_present(column: str) -> Mask:
+    def evaluate(view: _FrameView) -> np.ndarray:
+        series = view.column(column)
+        if series is None:
+            return view.nothing()
+        return series.notna().to_numpy()
+
+    return evaluate
+
+
+def _compile_bool(clause: Dict[str, Any]) -> Mask:
+    required = [query_to_mask(q) for q in clause.get("filter", []) + clause.get("must", [])]
+    should = [query_to_mask(q) for q in clause.get("should", [])]
+    must_not = [query_to_mask(q) for q in clause.get("must_not", [])]
+
+    # As in mlflow.search_runs, `metrics.x != 1` only matches runs that have
+    # the key. The same DSL comes from `not metrics.x = 1`, which therefore
+    # does not match runs without metrics.x either.
+    for q in clause.get("must_not", []):
+        if "nested" in q:
+            column, _ = _nested_column(q["nested"])
+            required.append(_key_present(column))
+
+    if should:
+        # OpenSearch only makes should clauses mandatory when there is no
+        # filter/must context, unless minimum_should_match says otherwise
+        default_msm = 0 if required else 1
+        minimum_should_match = int(clause.get("minimum_should_match", default_msm))
+        if minimum_should_match > 0:
+            required.append(_any_of(should, minimum_should_match))
+    if must_not:
+        required.append(_none_of(must_not))
+    return _all_of(required)
+
+
+def _nested_column(clause: Dict[str, Any]) -> tuple[str, List[Dict[str, Any]]]:
+    path = clause["path"]
+    key_field = f"{path}.key"
+
+    key = None
+    value_queries = []
+    for q in clause["query"]["bool"]["filter"]:
+        if "term" in q and key_field in q["term"]:
+            key = q["term"][key_field]
+        else:
+            value_queries.append(q)
+    if key is None:
+        raise ValueError(f"Nested query on '{path}' has no key term.")
+
+    # A run table stores each nested key as its own column, e.g.
+    # metrics.accuracy, while attributes are top-level columns
+    return run_table_column(path, key), value_queries
+
+
+def _compile_nested(clause: Dict[str, Any]) -> Mask:
+    column, value_queries = _nested_column(clause)
+    masks = []
+    for q in value_queries:
+        if "term" in q:
+            (_, value), = q["term"].items()
+            masks.append(_term_mask(column, value))
+        elif "range" in q:
+            (_, bounds), = q["range"].items()
+            masks.append(_range_mask(column, bounds))
+        else:
+            raise ValueError(f"Unsupported nested clause: {q}")
+    return _all_of(masks)
+
+
+def query_to_mask(query: Dict[str, Any]) -> Mask:
+    """
+    Compile an OpenSearch query (as produced by parser.ast_to_query) into a
+    function mapping a run table view to a boolean row mask.
+    """
+    if not query:
+        return lambda view: np.ones(view.n_rows, dtype=bool)
+
+    (kind, clause), = query.items()
+    if kind == "bool":
+        return _compile_bool(clause)
+    if kind == "nested":
+        return _compile_nested(clause)
+    if kind == "term":
+        (field, value), = clause.items()
+        return _term_mask(field, value)
+    if kind == "range":
+        (field, bounds), = clause.items()
+        return _range_mask(field, bounds)
+    raise ValueError(f"Unsupported query clause '{kind}'.")
+
+
+# ------------------------------------------------------------------------------
+# Public API
+# ------------------------------------------------------------------------------
+
+def compile_query(query: Dict[str, Any]) -> Callable[[pd.DataFrame], np.ndarray]:
+    """
+    Compile an OpenSearch query into a reusable DataFrame -> boolean mask function.
+    """
+    compiled = query_to_mask(query)
+    return lambda df: compiled(_FrameView(df))
+
+
+def compile_filter(filter_expr: str) -> Callable[[pd.DataFrame], np.ndarray]:
+    """
+    Compile a filter string into a reusable DataFrame -> boolean mask function.
+    """
+    return compile_query(ast_to_query(parse_filter_expression(filter_expr)))
+
+
+def filter_runs(df: pd.DataFrame, filter_expr: Optional[str]) -> pd.DataFrame:
+    if not filter_expr:
+        return df
+    return df[compile_filter(filter_expr)(df)]
+
+
+def _order_by_column(clause: str) -> tuple[str, bool]:
+    field_type, key, ascending = parse_order_by_clause(clause)
+    if field_type is None:
+        return key, ascending
+    return run_table_column(field_type, key), ascending
+
+
+def order_runs(
+    df: pd.DataFrame,
+    sort_by: List[tuple[str, bool]],
+    max_results: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Sort by (column, ascending) pairs, newest start_time first when none
+    apply, and keep the first max_results rows.
+    """
+    sort_columns, ascending = [], []
+    for column, asc in sort_by:
+        if column not in df.columns:
+            column = TOP_LEVEL_COLUMN_FALLBACKS.get(column, column)
+        if column not in df.columns:
+            # Missing keys sort last, i.e. the clause has no effect
+            continue
+        sort_columns.append(column)
+        ascending.append(asc)
+
+    if not sort_columns and "start_time" in df.columns:
+        sort_columns, ascending = ["start_time"], [False]
+    if sort_columns:
+        df = df.sort_values(sort_columns, ascending=ascending, na_position="last", kind="stable")
+
+    if max_results is not None:
+        df = df.head(max_results)
+    return df
+
+
+def search_runs_local(
+    df: pd.DataFrame,
+    filter_string: Optional[str] = None,
+    order_by: Optional[List[str]] = None,
+    max_results: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Local counterpart of parser.search_runs over a mlflow.search_runs-shaped
+    DataFrame (metrics.*, params.*, tags.* columns).
+    """
+    result = filter_runs(df, filter_string)
+    return order_runs(result, [_order_by_column(clause) for clause in order_by or []], max_results)
+
+
+# ------------------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------------------
+
+def build_synthetic_runs(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "run_id": np.char.add("run_", np.arange(n_rows).astype(str)),
+            "experiment_id": "1",
+            "status": rng.choice(["FINISHED", "FAILED", "RUNNING"], size=n_rows, p=[0.9, 0.05, 0.05]),
+            "start_time": pd.to_datetime(
+                1_700_000_000_000 + rng.integers(0, 10**9, size=n_rows), unit="ms", utc=True
+            ),
+            "metrics.accuracy": rng.random(n_rows),
+            "metrics.f1_score": rng.random(n_rows),
+            "params.criterion": rng.choice(["gini", "entropy"], size=n_rows),
+            "params.n_estimators": rng.choice(["5", "10", "20"], size=n_rows),
+            "params.bootstrap": rng.choice(["True", "False"], size=n_rows),
+        }
+    )
+
+
+def benchmark(n_rows: int = 1_000_000, repeats: int = 5) -> None:
+    df = build_synthetic_runs(n_rows)
+    filters = [
+        'params.criterion = "gini" and metrics.f1_score > 0.95',
+        'params.bootstrap = "False" and metrics.accuracy > 0.9',
+        '(metrics.accuracy > 0.5 or params.n_estimators >= 10) and not status = "FAILED"',
+    ]
+
+    for filter_expr in filters:
+        start = time.perf_counter()
+        mask_fn = compile_filter(filter_expr)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            mask = mask_fn(df)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+
+        print(
+            f"{filter_expr!r}: compile {compile_ms:.2f} ms, "
+            f"mask {best * 1000:.1f} ms ({n_rows / best / 1e6:.1f}M rows/s), "
+            f"{int(mask.sum())} matches"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
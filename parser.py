@@ -1,21 +1,53 @@
+import asyncio
 import json
-from opensearchpy import OpenSearch, helpers
+import os
+import weakref
+from functools import lru_cache
+from opensearchpy import AsyncOpenSearch, OpenSearch, TransportError, helpers
 from pyparsing import (
     Word, alphas, alphanums, nums, oneOf, opAssoc, infixNotation,
-    Keyword, Literal, CaselessKeyword, Group, ParserElement, quotedString,
-    removeQuotes, Regex
+    Keyword, Literal, CaselessKeyword, Group, ParserElement, ParseResults,
+    quotedString, removeQuotes, Regex
 )
 
+from search_cache import FRESH, RunSearchCache, cache_key
+
 # Enable packrat parsing for speed
 ParserElement.enablePackrat()
 
+# OpenSearch connection settings
+OPENSEARCH_HOSTS = [{
+    'host': os.getenv('OPENSEARCH_HOST', 'localhost'),
+    'port': int(os.getenv('OPENSEARCH_PORT', '9200'))
+}]
+OPENSEARCH_TIMEOUT = float(os.getenv('OPENSEARCH_TIMEOUT', '30'))
+OPENSEARCH_POOL_MAXSIZE = int(os.getenv('OPENSEARCH_POOL_MAXSIZE', '25'))
+
 # Initialize OpenSearch client
 client = OpenSearch(
-    hosts=[{'host': 'localhost', 'port': 9200}],
+    hosts=OPENSEARCH_HOSTS,
     http_compress=True,
-    timeout=30,
+    timeout=OPENSEARCH_TIMEOUT,
     max_retries=3,
-    retry_on_timeout=True
+    retry_on_timeout=True,
+    pool_maxsize=OPENSEARCH_POOL_MAXSIZE
+)
+
+# Async client, created lazily so it binds to the running event loop
+_async_client = None
+
+# In-flight async searches per event loop, keyed by index + request body;
+# a task can only be awaited from the loop that created it
+_inflight_searches = weakref.WeakKeyDictionary()
+
+# Seconds until an un-refreshed write becomes visible to searches
+INDEX_REFRESH_INTERVAL = float(os.getenv('OPENSEARCH_REFRESH_INTERVAL', '1'))
+
+# Result cache for repeated dashboard searches
+search_cache = RunSearchCache(
+    ttl_seconds=float(os.getenv('SEARCH_CACHE_TTL', '15')),
+    stale_seconds=float(os.getenv('SEARCH_CACHE_STALE', '60')),
+    max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '1024'))
 )
 
 # Define valid top-level fields
@@ -28,6 +60,19 @@ VALID_TOP_LEVEL_FIELDS = {
     'end_time'
 }
 
+# Define nested field types
+NESTED_FIELD_TYPES = {'metrics', 'params', 'tags', 'attributes'}
+
+# Index holding one document per run
+RUNS_INDEX = 'mlflow-runs'
+
+# Result size limits (mirroring MLflow's search_runs defaults)
+DEFAULT_MAX_RESULTS = 1000
+MAX_RESULTS_LIMIT = 50000
+
+# Percentiles reported by aggregate_runs unless the request overrides them
+DEFAULT_PERCENTS = [5, 25, 50, 75, 95, 99]
+
 # Define comparison operators
 comparison_ops = oneOf("= != > >= < <= eq ne gt ge lt le", caseless=True)
 
@@ -87,8 +132,11 @@ def ast_to_query(ast):
     if isinstance(ast, str):
         # Should not reach here in correct parsing
         return {}
-    elif isinstance(ast, list):
-        if len(ast) == 1:
+    elif isinstance(ast, (list, ParseResults)):
+        if 'op' in ast:
+            # This is a comparison expression
+            return comparison_to_query(ast)
+        elif len(ast) == 1:
             # Directly process the single element
             return ast_to_query(ast[0])
         elif len(ast) == 2:
@@ -104,42 +152,35 @@ def ast_to_query(ast):
                 }
             else:
                 raise ValueError(f"Unknown operator '{op}' in expression.")
-        elif len(ast) == 3:
-            left, op, right = ast
+        elif len(ast) >= 3 and len(ast) % 2 == 1:
+            # Chains of the same precedence level come back flat,
+            # e.g. [a, 'and', b, 'and', c]
+            op = ast[1]
             if isinstance(op, str) and op.lower() in ('and', 'or'):
-                left_query = ast_to_query(left)
-                right_query = ast_to_query(right)
+                operand_queries = [ast_to_query(operand) for operand in ast[0::2]]
                 if op.lower() == 'and':
                     return {
                         "bool": {
-                            "filter": [
-                                left_query,
-                                right_query
-                            ]
+                            "filter": operand_queries
                         }
                     }
                 elif op.lower() == 'or':
                     return {
                         "bool": {
-                            "should": [
-                                left_query,
-                                right_query
-                            ],
+                            "should": operand_queries,
                             "minimum_should_match": 1
                         }
                     }
             else:
-                # This is a comparison expression
-                return comparison_to_query(ast)
+                raise ValueError(f"Unknown operator '{op}' in expression.")
         else:
             raise ValueError("Invalid expression structure.")
     else:
-        # This is a comparison expression
-        return comparison_to_query(ast)
+        raise ValueError("Invalid expression structure.")
 
 def comparison_to_query(tokens):
     operator = tokens.op
-    value = tokens.value[0]  # Extract the string value
+    value = tokens.value  # Extract the string value
 
     # Check if it's a nested field or a top-level field
     if 'field_nested' in tokens:
@@ -266,13 +307,314 @@ def comparison_to_query(tokens):
     else:
         raise ValueError("Invalid field in filter expression.")
 
+def parse_order_by_clause(clause):
+    """
+    Split an order_by clause such as 'metrics.accuracy DESC' into
+    (field_type, key, ascending). field_type is None for top-level fields.
+    """
+    parts = clause.split()
+    if not parts or len(parts) > 2:
+        raise ValueError(f"Invalid order_by clause: '{clause}'")
+
+    direction = parts[1].upper() if len(parts) == 2 else 'ASC'
+    if direction not in ('ASC', 'DESC'):
+        raise ValueError(f"Invalid sort direction '{parts[1]}' in order_by clause: '{clause}'")
+    ascending = direction == 'ASC'
+
+    field_type, _, key = parts[0].partition('.')
+    if key and field_type.lower() in NESTED_FIELD_TYPES:
+        return field_type.lower(), key, ascending
+
+    if parts[0] not in VALID_TOP_LEVEL_FIELDS:
+        raise ValueError(f"Invalid field in order_by clause: '{parts[0]}'")
+    return None, parts[0], ascending
+
 def build_sort(order_by):
-    # [No changes needed here]
-    # ...
+    sort = []
+    for clause in order_by or []:
+        field_type, key, ascending = parse_order_by_clause(clause)
+        order = 'asc' if ascending else 'desc'
+
+        if field_type is None:
+            sort.append({key: {"order": order, "missing": "_last"}})
+        else:
+            # Metrics sort numerically, everything else on the keyword value
+            value_field = f"{field_type}.value.double" if field_type == 'metrics' else f"{field_type}.value"
+            sort.append({
+                value_field: {
+                    "order": order,
+                    "missing": "_last",
+                    "nested": {
+                        "path": field_type,
+                        "filter": {"term": {f"{field_type}.key": key}}
+                    }
+                }
+            })
+
+    if not sort:
+        # Same default ordering as MLflow: newest runs first
+        sort.append({"start_time": {"order": "desc"}})
+
+    # Tiebreaker so paging and result order are deterministic
+    sort.append({"run_id": {"order": "asc"}})
+    return sort
+
+@lru_cache(maxsize=1024)
+def translate_filter(filter_expr):
+    """
+    Parse and translate a filter string once; repeated filters reuse the
+    same (read-only) query dict.
+    """
+    return ast_to_query(parse_filter_expression(filter_expr))
+
+def build_run_filter(request_body):
+    experiment_id = request_body.get('experiment_id')
+    if not experiment_id:
+        raise ValueError("'experiment_id' is required.")
+
+    filters = [{"term": {"experiment_id": experiment_id}}]
+    filter_expr = request_body.get('filter')
+    if filter_expr:
+        filters.append(translate_filter(filter_expr))
+    return {"bool": {"filter": filters}}
+
+def build_search_body(request_body):
+    query = build_run_filter(request_body)
+
+    max_results = request_body.get('max_results', DEFAULT_MAX_RESULTS)
+    if not isinstance(max_results, int) or not 0 < max_results <= MAX_RESULTS_LIMIT:
+        raise ValueError(f"'max_results' must be an integer between 1 and {MAX_RESULTS_LIMIT}.")
+
+    return {
+        "query": query,
+        "sort": build_sort(request_body.get('order_by')),
+        "size": max_results
+    }
+
+def _runs_from_response(response):
+    return {
+        "runs": [hit['_source'] for hit in response['hits']['hits']]
+    }
+
+def search_runs(request_body, request_timeout=None, use_cache=True):
+    body = build_search_body(request_body)
+    params = {'request_timeout': request_timeout} if request_timeout else {}
+
+    def fetch():
+        return _runs_from_response(client.search(index=RUNS_INDEX, body=body, params=params))
+
+    if not use_cache:
+        return fetch()
+    return search_cache.get_or_fetch(
+        cache_key(request_body, body), request_body['experiment_id'], fetch
+    )
+
+def search_runs_many(request_bodies, request_timeout=None, use_cache=True):
+    """
+    Run several searches in one _msearch round trip; results come back in
+    the order of request_bodies. Cached results are served locally and
+    only the remaining searches are sent.
+    """
+    bodies = [build_search_body(request_body) for request_body in request_bodies]
+    keys = [cache_key(rb, body) for rb, body in zip(request_bodies, bodies)]
+    results = [None] * len(bodies)
+
+    pending = []
+    for i, key in enumerate(keys):
+        if use_cache:
+            # Stale entries ride along in the msearch instead of a separate refresh
+            value, state = search_cache.lookup(key)
+            if state == FRESH:
+                results[i] = value
+                continue
+        pending.append(i)
+
+    if not pending:
+        return results
+
+    msearch_body = []
+    for i in pending:
+        msearch_body.append({'index': RUNS_INDEX})
+        msearch_body.append(bodies[i])
+
+    generations = {
+        i: search_cache.generation(str(request_bodies[i]['experiment_id'])) for i in pending
+    }
+    params = {'request_timeout': request_timeout} if request_timeout else {}
+    response = client.msearch(body=msearch_body, params=params)
+
+    for i, item in zip(pending, response['responses']):
+        if 'error' in item:
+            raise TransportError(item.get('status', 'N/A'), item['error'].get('type', 'search_error'), item['error'])
+        results[i] = _runs_from_response(item)
+        if use_cache:
+            search_cache.store(keys[i], str(request_bodies[i]['experiment_id']), results[i], generations[i])
+
+    return results
+
+def build_aggregation_body(request_body):
+    """
+    Build a size-limited search that summarizes one metric over the runs
+    matched by 'filter': stats, percentiles, an optional histogram and
+    the top_k runs by that metric.
+    """
+    metric = request_body.get('metric')
+    if not metric:
+        raise ValueError("'metric' is required.")
+
+    top_k = request_body.get('top_k', 0)
+    if not isinstance(top_k, int) or not 0 <= top_k <= MAX_RESULTS_LIMIT:
+        raise ValueError(f"'top_k' must be an integer between 0 and {MAX_RESULTS_LIMIT}.")
+
+    value_field = 'metrics.value.double'
+    metric_aggs = {
+        "stats": {"stats": {"field": value_field}},
+        "percentiles": {
+            "percentiles": {
+                "field": value_field,
+                "percents": request_body.get('percents', DEFAULT_PERCENTS)
+            }
+        }
+    }
+
+    histogram_interval = request_body.get('histogram_interval')
+    histogram_buckets = request_body.get('histogram_buckets')
+    if histogram_interval is not None:
+        metric_aggs["histogram"] = {
+            "histogram": {"field": value_field, "interval": float(histogram_interval)}
+        }
+    elif histogram_buckets is not None:
+        # Bucket edges adapt to the data when no fixed interval is given
+        metric_aggs["histogram"] = {
+            "variable_width_histogram": {"field": value_field, "buckets": int(histogram_buckets)}
+        }
+
+    body = {
+        "query": build_run_filter(request_body),
+        "size": top_k,
+        "track_total_hits": True,
+        "aggs": {
+            "metric": {
+                "nested": {"path": "metrics"},
+                "aggs": {
+                    "key": {
+                        "filter": {"term": {"metrics.key": metric}},
+                        "aggs": metric_aggs
+                    }
+                }
+            }
+        }
+    }
+    if top_k:
+        body["sort"] = build_sort([f"metrics.{metric} DESC"])
+    return body
+
+def _aggregations_from_response(metric, response):
+    aggs = response['aggregations']['metric']['key']
+    result = {
+        "metric": metric,
+        "run_count": response['hits']['total']['value'],
+        "stats": aggs['stats'],
+        "percentiles": aggs['percentiles']['values'],
+        "top_runs": [hit['_source'] for hit in response['hits']['hits']]
+    }
+    if 'histogram' in aggs:
+        result["histogram"] = [
+            {"key": bucket['key'], "doc_count": bucket['doc_count']}
+            for bucket in aggs['histogram']['buckets']
+        ]
+    return result
+
+def aggregate_runs(request_body, request_timeout=None, use_cache=True):
+    body = build_aggregation_body(request_body)
+    params = {'request_timeout': request_timeout} if request_timeout else {}
+
+    def fetch():
+        response = client.search(index=RUNS_INDEX, body=body, params=params)
+        return _aggregations_from_response(request_body['metric'], response)
+
+    if not use_cache:
+        return fetch()
+    return search_cache.get_or_fetch(
+        cache_key(request_body, body), request_body['experiment_id'], fetch
+    )
+
+def index_runs(run_docs, refresh='wait_for'):
+    """
+    Bulk index run documents and invalidate cached searches of the
+    experiments they belong to. Without a refresh, caching stays off for
+    those experiments until the index refresh makes the writes visible.
+    """
+    actions = [
+        {'_index': RUNS_INDEX, '_id': doc['run_id'], '_source': doc}
+        for doc in run_docs
+    ]
+    try:
+        return helpers.bulk(client, actions, refresh=refresh)
+    finally:
+        # Invalidate even on partial failure: some documents may have landed
+        settle_seconds = 0.0 if refresh else INDEX_REFRESH_INTERVAL
+        for experiment_id in {str(doc['experiment_id']) for doc in run_docs}:
+            search_cache.invalidate_experiment(experiment_id, settle_seconds=settle_seconds)
+
+def get_async_client(pool_maxsize=None, timeout=None):
+    """
+    Return the shared AsyncOpenSearch client, creating it on first use.
+    Pool size and default timeout only apply when the client is created.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenSearch(
+            hosts=OPENSEARCH_HOSTS,
+            http_compress=True,
+            timeout=timeout or OPENSEARCH_TIMEOUT,
+            max_retries=3,
+            retry_on_timeout=True,
+            maxsize=pool_maxsize or OPENSEARCH_POOL_MAXSIZE
+        )
+    return _async_client
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+async def _coalesced_search(key, search):
+    # Identical concurrent searches share one request; shield() keeps a
+    # cancelled caller from cancelling the request for everyone else
+    inflight = _inflight_searches.setdefault(asyncio.get_running_loop(), {})
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(search())
+        inflight[key] = task
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+async def search_runs_async(request_body, request_timeout=None, coalesce=True, use_cache=True):
+    """
+    Async counterpart of search_runs. With coalesce=True, identical searches
+    already in flight are awaited instead of re-sent; coalesced and cached
+    callers share the returned run documents and should treat them as
+    read-only.
+    """
+    body = build_search_body(request_body)
+    params = {'request_timeout': request_timeout} if request_timeout else {}
+
+    async def search():
+        return await get_async_client().search(index=RUNS_INDEX, body=body, params=params)
+
+    async def fetch():
+        if not coalesce:
+            return _runs_from_response(await search())
+        key = json.dumps([RUNS_INDEX, body, request_timeout], sort_keys=True)
+        return _runs_from_response(await _coalesced_search(key, search))
 
-def search_runs(request_body):
-    # [No changes needed here]
-    # ...
+    if not use_cache:
+        return await fetch()
+    return await search_cache.aget_or_fetch(
+        cache_key(request_body, body), request_body['experiment_id'], fetch
+    )
 
 if __name__ == "__main__":
     request_body = {
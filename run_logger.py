@@ -0,0 +1,227 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing import util as mp_util
+from typing import Any, Optional
+
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+# Per-request limits of the log_batch endpoint
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_TAGS_PER_BATCH = 100
+MAX_ENTITIES_PER_BATCH = 1000
+
+
+@dataclass
+class _RunBuffer:
+    params: dict[str, Param] = field(default_factory=dict)
+    tags: dict[str, RunTag] = field(default_factory=dict)
+    metrics: list[Metric] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.params) + len(self.tags) + len(self.metrics)
+
+
+def split_batches(
+    params: list[Param],
+    metrics: list[Metric],
+    tags: list[RunTag],
+) -> list[tuple[list[Param], list[Metric], list[RunTag]]]:
+    """
+    Split entities into the fewest log_batch payloads that respect the
+    server's per-request limits.
+    """
+    batches = []
+    while params or metrics or tags:
+        n_params = min(len(params), MAX_PARAMS_TAGS_PER_BATCH)
+        n_tags = min(len(tags), MAX_PARAMS_TAGS_PER_BATCH - n_params)
+        room = MAX_ENTITIES_PER_BATCH - n_params - n_tags
+        n_metrics = min(len(metrics), MAX_METRICS_PER_BATCH, room)
+        batches.append((params[:n_params], metrics[:n_metrics], tags[:n_tags]))
+        params, metrics, tags = params[n_params:], metrics[n_metrics:], tags[n_tags:]
+    return batches
+
+
+class BufferedRunLogger:
+    """
+    Buffers params, metrics and tags per run and writes each run with
+    log_batch, usually a single request instead of one per value.
+
+    With background=True, flush() hands the batch to a writer thread and
+    returns immediately; close() drains it and re-raises the first write
+    error. close() is registered to run at interpreter and
+    multiprocessing-worker exit, so buffered values are not lost. A
+    logger inherited through fork starts empty in the child and is
+    flushed at the child's exit too.
+    """
+
+    def __init__(
+        self,
+        client: Optional[MlflowClient] = None,
+        background: bool = False,
+        max_pending: int = 1000,
+    ):
+        self._client = client
+        self.background = background
+        self.max_pending = max_pending
+
+        self._buffers: dict[str, _RunBuffer] = {}
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+        self._errors: list[BaseException] = []
+
+        self.requests = 0
+
+        atexit.register(self.close)
+        # atexit does not run in multiprocessing workers; their finalizers do
+        self._register_finalizer()
+        # Forked children inherit the buffers but not the writer thread, and
+        # multiprocessing clears their finalizers before running its own
+        # after-fork hooks, so the finalizer is registered again from there
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+        mp_util.register_after_fork(self, BufferedRunLogger._register_finalizer)
+
+    def _register_finalizer(self) -> None:
+        mp_util.Finalize(self, self.close, exitpriority=10)
+
+    def _reset_after_fork(self) -> None:
+        # Values buffered or queued before the fork are written by the parent
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._queue = None
+        self._worker = None
+        self._worker_pid = None
+        self._errors = []
+        self.requests = 0
+
+    @property
+    def client(self) -> MlflowClient:
+        # Created on first write so it picks up the tracking URI in effect then
+        if self._client is None:
+            self._client = MlflowClient()
+        return self._client
+
+    # --------------------------------------------------------------------------
+    # Buffering
+    # --------------------------------------------------------------------------
+
+    def _buffer(self, run_id: str) -> _RunBuffer:
+        buffer = self._buffers.get(run_id)
+        if buffer is None:
+            buffer = self._buffers[run_id] = _RunBuffer()
+        return buffer
+
+    def log_param(self, run_id: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._buffer(run_id).params[key] = Param(key, str(value))
+
+    def log_params(self, run_id: str, params: dict[str, Any]) -> None:
+        with self._lock:
+            buffer = self._buffer(run_id)
+            for key, value in params.items():
+                buffer.params[key] = Param(key, str(value))
+
+    def log_metric(
+        self,
+        run_id: str,
+        key: str,
+        value: float,
+        step: int = 0,
+        timestamp: Optional[int] = None,
+    ) -> None:
+        timestamp = timestamp or int(time.time() * 1000)
+        with self._lock:
+            self._buffer(run_id).metrics.append(Metric(key, float(value), timestamp, step))
+
+    def log_metrics(self, run_id: str, metrics: dict[str, float], step: int = 0) -> None:
+        timestamp = int(time.time() * 1000)
+        with self._lock:
+            buffer = self._buffer(run_id)
+            for key, value in metrics.items():
+                buffer.metrics.append(Metric(key, float(value), timestamp, step))
+
+    def set_tag(self, run_id: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._buffer(run_id).tags[key] = RunTag(key, str(value))
+
+    def set_tags(self, run_id: str, tags: dict[str, Any]) -> None:
+        with self._lock:
+            buffer = self._buffer(run_id)
+            for key, value in tags.items():
+                buffer.tags[key] = RunTag(key, str(value))
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(b) for b in self._buffers.values())
+
+    # --------------------------------------------------------------------------
+    # Writing
+    # --------------------------------------------------------------------------
+
+    def flush(self, run_id: Optional[str] = None) -> None:
+        """
+        Write the buffered values of one run (or of every run).
+        """
+        with self._lock:
+            run_ids = [run_id] if run_id is not None else list(self._buffers)
+            drained = [(rid, self._buffers.pop(rid)) for rid in run_ids if rid in self._buffers]
+
+        for rid, buffer in drained:
+            if not len(buffer):
+                continue
+            if self.background:
+                self._ensure_worker()
+                self._queue.put((rid, buffer))
+            else:
+                self._write(rid, buffer)
+
+    def _write(self, run_id: str, buffer: _RunBuffer) -> None:
+        for params, metrics, tags in split_batches(
+            list(buffer.params.values()), buffer.metrics, list(buffer.tags.values())
+        ):
+            self.client.log_batch(run_id, metrics=metrics, params=params, tags=tags)
+            self.requests += 1
+
+    def _ensure_worker(self) -> None:
+        # Threads do not survive fork, so a forked copy starts its own writer
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._worker_pid = os.getpid()
+        self._worker = threading.Thread(target=self._drain, name="run-logger", daemon=True)
+        self._worker.start()
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                try:
+                    self._write(*item)
+                except Exception as exc:
+                    self._errors.append(exc)
+            finally:
+                self._queue.task_done()
+
+    def close(self) -> None:
+        """
+        Flush everything, wait for the writer thread and raise the first
+        error it hit.
+        """
+        self.flush()
+        worker = self._worker
+        if worker is not None and self._worker_pid == os.getpid() and worker.is_alive():
+            self._queue.put(None)
+            worker.join()
+        self._worker = None
+
+        if self._errors:
+            error, self._errors = self._errors[0], []
+            raise error
@@ -0,0 +1,198 @@
+import hashlib
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import mlflow
+import pandas as pd
+from mlflow.exceptions import MlflowException
+from mlflow.utils.search_utils import SearchUtils
+
+from local_search import compile_query, order_runs, run_table_column
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "RUN_TABLE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "mlflow-run-tables"),
+)
+TERMINAL_STATUSES = ("FINISHED", "FAILED", "KILLED")
+
+# mlflow search entity types -> run table column prefixes
+ENTITY_PATHS = {
+    "metric": "metrics",
+    "parameter": "params",
+    "tag": "tags",
+    "attribute": "attributes",
+}
+RANGE_COMPARATORS = {">": "gt", ">=": "gte", "<": "lt", "<=": "lte"}
+# Spellings mlflow accepts for attributes.start_time and attributes.run_name
+ATTRIBUTE_ALIASES = {"created": "start_time", "run name": "run_name"}
+
+
+def _key(entity: str, key: str) -> str:
+    return ATTRIBUTE_ALIASES.get(key.lower(), key) if entity == "attribute" else key
+
+
+def _unsupported(what: str) -> ValueError:
+    return ValueError(f"{what} is not supported by the run table cache; use mlflow.search_runs instead.")
+
+
+def _clause_to_query(clause: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One parsed mlflow filter clause as the query DSL local_search compiles.
+    """
+    path = ENTITY_PATHS.get(clause["type"])
+    comparator = clause["comparator"].upper()
+    if path is None:
+        raise _unsupported(f"Filtering on {clause['type']} fields")
+    if comparator not in ("=", "!=", *RANGE_COMPARATORS):
+        raise _unsupported(f"The {comparator} comparator")
+
+    if comparator in RANGE_COMPARATORS:
+        value_query = {"range": {f"{path}.value.double": {RANGE_COMPARATORS[comparator]: float(clause["value"])}}}
+    else:
+        value_query = {"term": {f"{path}.value": clause["value"]}}
+    nested = {
+        "nested": {
+            "path": path,
+            "query": {"bool": {"filter": [{"term": {f"{path}.key": _key(clause["type"], clause["key"])}}, value_query]}},
+        }
+    }
+    return {"bool": {"must_not": [nested]}} if comparator == "!=" else nested
+
+
+class RunTableCache:
+    """
+    Parquet snapshot of one experiment's runs (the mlflow.search_runs
+    DataFrame) that answers filter_string / order_by / max_results queries
+    locally via local_search.
+
+    Refreshes are incremental: only runs started within lookback_seconds of
+    the newest cached start_time are fetched, plus runs that were still
+    active at the last refresh, so late metrics and tags on recent runs are
+    picked up. Changes to older finished runs and deletions need
+    refresh(full=True).
+
+    Snapshots are keyed by experiment id and the tracking URI current at
+    construction, which is the server search_fn (mlflow.search_runs)
+    queries, since different tracking servers reuse the same experiment
+    ids.
+    """
+
+    def __init__(
+        self,
+        experiment_id: str,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_age_seconds: float = 30.0,
+        lookback_seconds: float = 900.0,
+        search_fn: Callable[..., pd.DataFrame] = mlflow.search_runs,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.experiment_id = str(experiment_id)
+        self.tracking_uri = mlflow.get_tracking_uri()
+        server = hashlib.sha256(self.tracking_uri.encode("utf-8")).hexdigest()[:12]
+        self.path = os.path.join(cache_dir, f"runs-{server}-{self.experiment_id}.parquet")
+        self.max_age_seconds = max_age_seconds
+        self.lookback_seconds = lookback_seconds
+        self._search_fn = search_fn
+        self._clock = clock
+
+        self._df: Optional[pd.DataFrame] = None
+        self._refreshed_at: Optional[float] = None
+
+        self.fetches = 0
+        self.rows_fetched = 0
+
+    # --------------------------------------------------------------------------
+    # Snapshot maintenance
+    # --------------------------------------------------------------------------
+
+    def _load(self) -> pd.DataFrame:
+        if self._df is None:
+            self._df = pd.read_parquet(self.path) if os.path.exists(self.path) else pd.DataFrame()
+        return self._df
+
+    def _fetch(self, filter_string: str = "") -> pd.DataFrame:
+        if mlflow.get_tracking_uri() != self.tracking_uri:
+            # The fetch would merge another server's runs into this snapshot
+            raise RuntimeError(
+                f"Tracking URI changed from {self.tracking_uri!r} since the run table cache was created."
+            )
+        self.fetches += 1
+        fetched = self._search_fn(experiment_ids=[self.experiment_id], filter_string=filter_string)
+        self.rows_fetched += len(fetched)
+        return fetched
+
+    def refresh(self, full: bool = False) -> pd.DataFrame:
+        cached = pd.DataFrame() if full else self._load()
+
+        if cached.empty or "start_time" not in cached:
+            merged = self._fetch()
+        else:
+            watermark = cached["start_time"].max()
+            since_ms = int(watermark.timestamp() * 1000 - self.lookback_seconds * 1000)
+            fetched = [self._fetch(f"attributes.start_time >= {since_ms}")]
+
+            # Active runs started before the window can still change
+            active = cached.loc[
+                ~cached["status"].isin(TERMINAL_STATUSES)
+                & (cached["start_time"] < pd.Timestamp(since_ms, unit="ms", tz=watermark.tz)),
+                "run_id",
+            ].tolist()
+            if active:
+                ids = ", ".join(f"'{run_id}'" for run_id in active)
+                fetched.append(self._fetch(f"attributes.run_id IN ({ids})"))
+
+            merged = pd.concat([cached, *fetched], ignore_index=True)
+            merged = merged.drop_duplicates(subset="run_id", keep="last")
+
+        if not merged.empty:
+            merged = merged.sort_values("start_time", ascending=False, kind="stable").reset_index(drop=True)
+            self._write(merged)
+        self._df = merged
+        self._refreshed_at = self._clock()
+        return merged
+
+    def _write(self, df: pd.DataFrame) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+
+    def runs(self) -> pd.DataFrame:
+        """
+        The cached run table, refreshed when older than max_age_seconds.
+        """
+        if self._refreshed_at is None or self._clock() - self._refreshed_at > self.max_age_seconds:
+            return self.refresh()
+        return self._df
+
+    # --------------------------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------------------------
+
+    def search(
+        self,
+        filter_string: Optional[str] = None,
+        order_by: Optional[List[str]] = None,
+        max_results: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        mlflow.search_runs for one experiment, answered from the local
+        snapshot. Filters and order_by use mlflow's syntax, including
+        backticked keys and attributes.* / run_name; comparators other
+        than = != < <= > >= (LIKE, ILIKE, IN, ...) raise ValueError.
+        """
+        try:
+            clauses = SearchUtils.parse_search_filter(filter_string)
+            sort_by = [SearchUtils.parse_order_by_for_search_runs(clause) for clause in order_by or []]
+        except MlflowException as e:
+            raise ValueError(f"Invalid run table cache search: {e.message}") from e
+
+        df = self.runs()
+        if clauses:
+            df = df[compile_query({"bool": {"filter": [_clause_to_query(c) for c in clauses]}})(df)]
+        return order_runs(
+            df,
+            [(run_table_column(ENTITY_PATHS[entity], _key(entity, key)), ascending) for entity, key, ascending in sort_by],
+            max_results,
+        )
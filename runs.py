@@ -1,16 +1,27 @@
+import hashlib
+import json
+import math
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
 import mlflow
-import mlflow.sklearn
+import numpy as np
+import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.datasets import load_iris
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
 
-# Set or create an experiment
-mlflow.set_experiment("Enhanced_Experiment")
+from artifact_uploader import BackgroundModelUploader, TopKGate
+from run_logger import BufferedRunLogger
+from run_table_cache import RunTableCache
 
-# Load data
-X, y = load_iris(return_X_y=True)
-X_train, X_test, y_train, y_test = train_test_split(X, y, random_state=42, stratify=y)
+EXPERIMENT_NAME = "Enhanced_Experiment"
 
 # Parameter grid with more parameters
 param_grid = [
@@ -21,68 +32,512 @@ param_grid = [
     {"n_estimators": 20, "max_depth": 10, "criterion": "gini", "bootstrap": True},
 ]
 
-for i, params in enumerate(param_grid):
-    with mlflow.start_run(run_name=f"run_{i}"):
-        # Log parameters
-        mlflow.log_param("n_estimators", params["n_estimators"])
-        mlflow.log_param("max_depth", params["max_depth"])
-        mlflow.log_param("criterion", params["criterion"])
-        mlflow.log_param("bootstrap", params["bootstrap"])
-
-        # Train model
-        clf = RandomForestClassifier(
-            n_estimators=params["n_estimators"],
-            max_depth=params["max_depth"],
-            criterion=params["criterion"],
-            bootstrap=params["bootstrap"],
-            random_state=42
+
+@lru_cache(maxsize=1)
+def load_data():
+    # Loaded once per process; workers reuse their copy across trials
+    X, y = load_iris(return_X_y=True)
+    return train_test_split(X, y, random_state=42, stratify=y)
+
+
+@lru_cache(maxsize=1)
+def dataset_fingerprint() -> str:
+    """
+    Hash of the train/test split contents, so cached results are only
+    reused against the same data.
+    """
+    digest = hashlib.sha256()
+    for array in load_data():
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype}{array.shape}".encode("utf-8"))
+        digest.update(array.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def config_hash(params: Dict[str, Any], data_fraction: float = 1.0) -> str:
+    payload = json.dumps(
+        {
+            "model": "RandomForestClassifier",
+            "random_state": 42,
+            "params": params,
+            "data_fraction": data_fraction,
+            "dataset": dataset_fingerprint(),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def train_and_evaluate(
+    params: Dict[str, Any],
+    n_jobs: int = 1,
+    data_fraction: float = 1.0,
+) -> Tuple[RandomForestClassifier, Dict[str, float]]:
+    X_train, X_test, y_train, y_test = load_data()
+    if data_fraction < 1.0:
+        # Stratified subsample so small budgets still see every class
+        X_train, _, y_train, _ = train_test_split(
+            X_train, y_train, train_size=data_fraction, random_state=42, stratify=y_train
+        )
+
+    clf = RandomForestClassifier(
+        n_estimators=params["n_estimators"],
+        max_depth=params["max_depth"],
+        criterion=params["criterion"],
+        bootstrap=params["bootstrap"],
+        random_state=42,
+        n_jobs=n_jobs,
+    )
+    clf.fit(X_train, y_train)
+
+    preds = clf.predict(X_test)
+    metrics = {
+        "accuracy": accuracy_score(y_test, preds),
+        "precision": precision_score(y_test, preds, average='weighted'),
+        "recall": recall_score(y_test, preds, average='weighted'),
+        "f1_score": f1_score(y_test, preds, average='weighted'),
+    }
+    return clf, metrics
+
+
+# ------------------------------------------------------------------------------
+# Sweep execution
+# ------------------------------------------------------------------------------
+
+_run_logger: Optional[BufferedRunLogger] = None
+
+
+def get_run_logger() -> BufferedRunLogger:
+    global _run_logger
+    if _run_logger is None:
+        _run_logger = BufferedRunLogger(background=os.getenv("SWEEP_ASYNC_LOGGING", "0") == "1")
+    return _run_logger
+
+
+def run_trial(
+    index: int,
+    params: Dict[str, Any],
+    n_jobs: int = 1,
+    run_name: Optional[str] = None,
+    tags: Optional[Dict[str, Any]] = None,
+    data_fraction: float = 1.0,
+    log_model: bool = True,
+) -> Dict[str, Any]:
+    """
+    Train one grid point inside its own MLflow run and return a row of the
+    sweep results table. With log_model the fitted model is returned under
+    "model" for the caller to upload, keeping serialization out of the
+    training process.
+    """
+    start = time.perf_counter()
+    logger = get_run_logger()
+    with mlflow.start_run(run_name=run_name or f"run_{index}") as run:
+        run_id = run.info.run_id
+        logger.log_params(run_id, params)
+        if data_fraction < 1.0:
+            logger.log_param(run_id, "data_fraction", data_fraction)
+        logger.set_tags(
+            run_id,
+            {
+                **(tags or {}),
+                "sweep.config_hash": config_hash(params, data_fraction),
+                "sweep.dataset_fingerprint": dataset_fingerprint(),
+            },
         )
-        clf.fit(X_train, y_train)
-        
-        # Predictions and metrics
-        preds = clf.predict(X_test)
-        accuracy = accuracy_score(y_test, preds)
-        precision = precision_score(y_test, preds, average='weighted')
-        recall = recall_score(y_test, preds, average='weighted')
-        f1 = f1_score(y_test, preds, average='weighted')
-
-        # Log metrics
-        mlflow.log_metric("accuracy", accuracy)
-        mlflow.log_metric("precision", precision)
-        mlflow.log_metric("recall", recall)
-        mlflow.log_metric("f1_score", f1)
-
-        # Log model artifact
-        mlflow.sklearn.log_model(clf, "model")
-        
-# Retrieve the experiment ID
-experiment = mlflow.get_experiment_by_name("Enhanced_Experiment")
-experiment_id = experiment.experiment_id
-
-# Example: Search for runs with 'criterion' = 'gini' and 'f1_score' > 0.95
-runs_df = mlflow.search_runs(
-    experiment_ids=[experiment_id],
-    filter_string='params.criterion = "gini" and metrics.f1_score > 0.95',
-    order_by=["metrics.f1_score DESC"]
-)
-print("High f1-score runs using Gini criterion:")
-print(runs_df[["run_id", "params.n_estimators", "params.max_depth", "params.criterion", "metrics.f1_score"]])
-
-# Another Query: Runs with bootstrap=False and accuracy > 0.9
-runs_df = mlflow.search_runs(
-    [experiment_id],
-    filter_string='params.bootstrap = "False" and metrics.accuracy > 0.9',
-    order_by=["metrics.accuracy DESC"]
-)
-print("\nHigh accuracy runs without bootstrap:")
-print(runs_df[["run_id", "params.n_estimators", "params.max_depth", "params.bootstrap", "metrics.accuracy"]])
-
-# Get the single best run overall by f1_score
-top_run = mlflow.search_runs(
-    [experiment_id], 
-    order_by=["metrics.f1_score DESC"], 
-    max_results=1
-)
-print("\nOverall best run by f1_score:")
-print(top_run[["run_id", "metrics.f1_score", "params.n_estimators", "params.max_depth", "params.criterion"]])
 
+        clf, metrics = train_and_evaluate(params, n_jobs=n_jobs, data_fraction=data_fraction)
+
+        # Params and metrics go out together in one log_batch request
+        logger.log_metrics(run_id, metrics)
+        logger.flush(run_id)
+
+    row = {
+        "trial": index,
+        "run_id": run.info.run_id,
+        **params,
+        **metrics,
+        "seconds": time.perf_counter() - start,
+        "reused": False,
+    }
+    if log_model:
+        row["model"] = clf
+    return row
+
+
+def _init_worker(tracking_uri: str, experiment_name: str) -> None:
+    # A logger inherited from the parent has no exit hook in this process;
+    # drop it so the first trial creates one that is flushed at worker exit
+    global _run_logger
+    _run_logger = None
+    mlflow.set_tracking_uri(tracking_uri)
+    mlflow.set_experiment(experiment_name)
+
+
+def plan_workers(
+    n_trials: int,
+    max_workers: Optional[int] = None,
+    n_jobs: int = 1,
+    total_cores: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    Split the core budget between concurrent trials and per-trial n_jobs
+    so that workers * n_jobs never exceeds the available cores.
+    """
+    total_cores = total_cores or os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, total_cores))
+    workers = max(1, min(max_workers or total_cores // n_jobs, total_cores // n_jobs, n_trials))
+    return workers, n_jobs
+
+
+METRIC_NAMES = ("accuracy", "precision", "recall", "f1_score")
+
+
+def find_completed(experiment_name: str, hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Latest finished run per config hash, fetched with one search_runs call
+    over all runs on the current dataset (tag filters do not support IN).
+    """
+    experiment = mlflow.get_experiment_by_name(experiment_name)
+    if experiment is None or not hashes:
+        return {}
+
+    runs_df = mlflow.search_runs(
+        [experiment.experiment_id],
+        filter_string=(
+            f"tags.`sweep.dataset_fingerprint` = '{dataset_fingerprint()}' "
+            "and attributes.status = 'FINISHED'"
+        ),
+        order_by=["attributes.start_time DESC"],
+    )
+    if runs_df.empty or "tags.sweep.config_hash" not in runs_df:
+        return {}
+
+    wanted = set(hashes)
+    completed: Dict[str, Dict[str, Any]] = {}
+    for row in runs_df.to_dict("records"):
+        key = row["tags.sweep.config_hash"]
+        if key not in wanted or key in completed:
+            continue
+        metrics = {name: row.get(f"metrics.{name}") for name in METRIC_NAMES}
+        if any(value is None or pd.isna(value) for value in metrics.values()):
+            continue
+        completed[key] = {"run_id": row["run_id"], **metrics}
+    return completed
+
+
+@dataclass
+class ModelLogging:
+    """
+    Uploads a trial's model only while its metric ranks in the top k of
+    the trials seen so far (every trial when top_k is None).
+    """
+
+    gate: TopKGate
+    uploader: BackgroundModelUploader
+    metric: str = "f1_score"
+
+    @classmethod
+    def create(cls, top_k: Optional[int], compress: bool = False, metric: str = "f1_score") -> "ModelLogging":
+        return cls(TopKGate(top_k), BackgroundModelUploader(compress=compress), metric)
+
+    def offer(self, row: Dict[str, Any], wants_model: bool) -> None:
+        model = row.pop("model", None)
+        row["model_logged"] = False
+        if not wants_model:
+            return
+        # Reused trials compete for the top k but already have their artifacts
+        if self.gate.observe(row[self.metric]) and model is not None:
+            self.uploader.submit(row["run_id"], model)
+            row["model_logged"] = True
+
+    def close(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Wait for pending uploads and unmark the rows whose upload failed.
+        """
+        self.uploader.close()
+        for row in rows:
+            if row["run_id"] in self.uploader.failures:
+                row["model_logged"] = False
+
+
+def _execute(
+    trials: List[Tuple[int, Dict[str, Any], Dict[str, Any]]],
+    workers: int,
+    n_jobs: int,
+    experiment_name: str,
+    skip_completed: bool = True,
+    models: Optional[ModelLogging] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run (index, params, run_trial kwargs) triples and return their rows in
+    submission order. With skip_completed, configurations that already
+    have a finished run on the same dataset reuse its metrics instead.
+    Models are handed to the background uploader as trials finish.
+    """
+    rows: List[Optional[Dict[str, Any]]] = [None] * len(trials)
+
+    def finish(position: int, row: Dict[str, Any]) -> None:
+        if models is not None:
+            models.offer(row, wants_model=trials[position][2].get("log_model", True))
+        else:
+            row.pop("model", None)
+        rows[position] = row
+
+    if skip_completed:
+        hashes = [config_hash(params, kwargs.get("data_fraction", 1.0)) for _, params, kwargs in trials]
+        completed = find_completed(experiment_name, hashes)
+        for position, ((i, params, _), key) in enumerate(zip(trials, hashes)):
+            if key in completed:
+                finish(position, {"trial": i, **params, **completed[key], "seconds": 0.0, "reused": True})
+
+    pending = [position for position, row in enumerate(rows) if row is None]
+    if not pending:
+        return rows
+
+    if min(workers, len(pending)) == 1:
+        for position in pending:
+            i, params, kwargs = trials[position]
+            finish(position, run_trial(i, params, n_jobs, **kwargs))
+        # Drain background writes so the runs are complete when we return
+        get_run_logger().close()
+        return rows
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(pending)),
+        initializer=_init_worker,
+        initargs=(mlflow.get_tracking_uri(), experiment_name),
+    ) as pool:
+        futures = {
+            pool.submit(run_trial, trials[position][0], trials[position][1], n_jobs, **trials[position][2]): position
+            for position in pending
+        }
+        for future in as_completed(futures):
+            finish(futures[future], future.result())
+    return rows
+
+
+def run_sweep(
+    grid: List[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    n_jobs: int = 1,
+    experiment_name: str = EXPERIMENT_NAME,
+    skip_completed: bool = True,
+    model_top_k: Optional[int] = 3,
+    compress_models: bool = False,
+) -> pd.DataFrame:
+    """
+    Run every grid point across a process pool, each worker logging its
+    own MLflow runs. Returns one row per trial in grid order; reused rows
+    point at the earlier run that produced their metrics. Models are only
+    uploaded for trials in the running top model_top_k by f1_score
+    (None uploads all).
+    """
+    workers, n_jobs = plan_workers(len(grid), max_workers, n_jobs)
+    mlflow.set_experiment(experiment_name)
+    models = ModelLogging.create(model_top_k, compress=compress_models)
+
+    start = time.perf_counter()
+    trials = [(i, params, {}) for i, params in enumerate(grid)]
+    rows = _execute(trials, workers, n_jobs, experiment_name, skip_completed, models)
+    train_seconds = time.perf_counter() - start
+    models.close(rows)
+    wall_seconds = time.perf_counter() - start
+
+    n_reused = sum(row["reused"] for row in rows)
+    print(
+        f"swept {len(grid)} configurations ({n_reused} reused) on {workers} workers x {n_jobs} jobs "
+        f"in {train_seconds:.2f} s, {models.uploader.uploaded} models uploaded "
+        f"({len(models.uploader.failures)} failed) by {wall_seconds:.2f} s"
+    )
+    return pd.DataFrame(rows)
+
+
+# ------------------------------------------------------------------------------
+# Successive halving
+# ------------------------------------------------------------------------------
+
+HALVING_RESOURCES = ("n_estimators", "data_fraction")
+
+
+def halving_budgets(min_resource: float, max_resource: float, eta: int) -> List[float]:
+    """
+    Geometric budget ladder min_resource * eta**i, ending at max_resource.
+    """
+    n_rungs = int(math.floor(math.log(max_resource / min_resource, eta) + 1e-9)) + 1
+    budgets = [min_resource * eta ** i for i in range(n_rungs)]
+    budgets[-1] = max_resource
+    return budgets
+
+
+def successive_halving(
+    grid: List[Dict[str, Any]],
+    resource: str = "n_estimators",
+    min_resource: Optional[float] = None,
+    max_resource: Optional[float] = None,
+    eta: int = 2,
+    metric: str = "f1_score",
+    max_workers: Optional[int] = None,
+    n_jobs: int = 1,
+    experiment_name: str = EXPERIMENT_NAME,
+    skip_completed: bool = True,
+    model_top_k: Optional[int] = 3,
+    compress_models: bool = False,
+) -> pd.DataFrame:
+    """
+    Train every candidate on a small budget, keep the best 1/eta by metric
+    and repeat with eta times the budget until the full budget is reached.
+
+    The budget is either the forest size (resource="n_estimators", which
+    overrides that grid parameter) or the share of training rows
+    (resource="data_fraction"). Each trial is its own MLflow run tagged
+    with its rung, budget and pruning decision; only the final rung logs
+    models, limited to the running top model_top_k. Returns one row per
+    trial. Decision tags are only written to runs this sweep created;
+    reused trials keep the tags of the sweep that ran them and get their
+    decision in the returned rows only.
+    """
+    if resource not in HALVING_RESOURCES:
+        raise ValueError(f"resource must be one of {HALVING_RESOURCES}, got '{resource}'")
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+
+    if resource == "n_estimators":
+        max_resource = max_resource or max(p["n_estimators"] for p in grid)
+        min_resource = min_resource or max(1, max_resource // eta ** 2)
+        # Grid points differing only in the resource are the same candidate
+        candidates = []
+        for params in grid:
+            params = {k: v for k, v in params.items() if k != "n_estimators"}
+            if params not in candidates:
+                candidates.append(params)
+    else:
+        max_resource = max_resource or 1.0
+        min_resource = min_resource or max_resource / eta ** 2
+        candidates = [dict(p) for p in grid]
+
+    budgets = halving_budgets(min_resource, max_resource, eta)
+    sweep_id = uuid.uuid4().hex[:12]
+    workers, n_jobs = plan_workers(len(candidates), max_workers, n_jobs)
+    mlflow.set_experiment(experiment_name)
+    logger = get_run_logger()
+    models = ModelLogging.create(model_top_k, compress=compress_models, metric=metric)
+
+    start = time.perf_counter()
+    survivors = list(range(len(candidates)))
+    all_rows = []
+    for rung, budget in enumerate(budgets):
+        last_rung = rung == len(budgets) - 1
+        trials = []
+        for c in survivors:
+            params = dict(candidates[c])
+            kwargs: Dict[str, Any] = {
+                "run_name": f"halving_{sweep_id}_r{rung}_c{c}",
+                "tags": {
+                    "sweep.mode": "successive_halving",
+                    "sweep.id": sweep_id,
+                    "halving.candidate": c,
+                    "halving.rung": rung,
+                    "halving.resource": resource,
+                    "halving.budget": budget,
+                },
+                "log_model": last_rung,
+            }
+            if resource == "n_estimators":
+                params["n_estimators"] = int(budget)
+            else:
+                kwargs["data_fraction"] = budget
+            trials.append((c, params, kwargs))
+
+        rows = _execute(trials, workers, n_jobs, experiment_name, skip_completed, models)
+
+        # Stable ranking: ties keep the earlier candidate
+        ranked = sorted(range(len(rows)), key=lambda i: -rows[i][metric])
+        n_keep = 1 if last_rung else max(1, len(rows) // eta)
+        kept = set(ranked[:n_keep])
+        for position, row in enumerate(rows):
+            if last_rung:
+                decision = "best" if position in kept else "final"
+            else:
+                decision = "promoted" if position in kept else "pruned"
+            row.update(rung=rung, budget=budget, decision=decision)
+            if row["reused"]:
+                continue
+            logger.set_tags(
+                row["run_id"],
+                {
+                    "halving.decision": decision,
+                    "halving.rank": ranked.index(position) + 1,
+                    "halving.rung_size": len(rows),
+                },
+            )
+        logger.flush()
+        all_rows.extend(rows)
+        survivors = [rows[i]["trial"] for i in sorted(kept)]
+    logger.close()
+    models.close(all_rows)
+    wall_seconds = time.perf_counter() - start
+
+    spent = sum(row["budget"] for row in all_rows)
+    full = len(candidates) * max_resource
+    print(
+        f"successive halving over {len(candidates)} candidates, budgets {budgets}: "
+        f"{len(all_rows)} trials, {spent / full:.0%} of the full-budget compute, {wall_seconds:.2f} s"
+    )
+    return pd.DataFrame(all_rows)
+
+
+# ------------------------------------------------------------------------------
+# Queries
+# ------------------------------------------------------------------------------
+
+def print_queries(experiment_id: str, cache: Optional[RunTableCache] = None) -> None:
+    # All queries are answered from one local snapshot of the experiment
+    cache = cache or RunTableCache(experiment_id)
+
+    # Example: Search for runs with 'criterion' = 'gini' and 'f1_score' > 0.95
+    runs_df = cache.search(
+        filter_string='params.criterion = "gini" and metrics.f1_score > 0.95',
+        order_by=["metrics.f1_score DESC"]
+    )
+    print("High f1-score runs using Gini criterion:")
+    print(runs_df[["run_id", "params.n_estimators", "params.max_depth", "params.criterion", "metrics.f1_score"]])
+
+    # Another Query: Runs with bootstrap=False and accuracy > 0.9
+    runs_df = cache.search(
+        filter_string='params.bootstrap = "False" and metrics.accuracy > 0.9',
+        order_by=["metrics.accuracy DESC"]
+    )
+    print("\nHigh accuracy runs without bootstrap:")
+    print(runs_df[["run_id", "params.n_estimators", "params.max_depth", "params.bootstrap", "metrics.accuracy"]])
+
+    # Get the single best run overall by f1_score
+    top_run = cache.search(
+        order_by=["metrics.f1_score DESC"],
+        max_results=1
+    )
+    print("\nOverall best run by f1_score:")
+    print(top_run[["run_id", "metrics.f1_score", "params.n_estimators", "params.max_depth", "params.criterion"]])
+
+
+def main():
+    top_k = os.getenv("SWEEP_MODEL_TOP_K", "3")
+    options = {
+        "max_workers": int(os.getenv("SWEEP_MAX_WORKERS", "0")) or None,
+        "n_jobs": int(os.getenv("SWEEP_N_JOBS", "1")),
+        "model_top_k": None if top_k == "all" else int(top_k),
+        "compress_models": os.getenv("SWEEP_COMPRESS_MODELS", "0") == "1",
+    }
+    if os.getenv("SWEEP_MODE", "grid") == "halving":
+        results = successive_halving(param_grid, **options)
+    else:
+        results = run_sweep(param_grid, **options)
+    print(results.to_string(index=False))
+
+    # Retrieve the experiment ID
+    experiment = mlflow.get_experiment_by_name(EXPERIMENT_NAME)
+    print_queries(experiment.experiment_id)
+
+
+if __name__ == "__main__":
+    main()
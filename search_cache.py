@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+@dataclass
+class _Entry:
+    value: Any
+    experiment_id: str
+    stored_at: float
+
+
+def canonical_request(request_body: dict[str, Any]) -> dict[str, Any]:
+    filter_expr = request_body.get("filter") or ""
+    return {
+        "experiment_id": str(request_body.get("experiment_id")),
+        "filter": " ".join(filter_expr.split()),
+        "order_by": [" ".join(c.split()) for c in request_body.get("order_by") or []],
+        "max_results": request_body.get("max_results"),
+    }
+
+
+def cache_key(request_body: dict[str, Any], query_body: dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"request": canonical_request(request_body), "dsl": query_body},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RunSearchCache:
+    """
+    TTL + LRU cache of search results with stale-while-revalidate.
+
+    Entries younger than ttl_seconds are served as-is. Entries up to
+    ttl_seconds + stale_seconds old are served immediately while a single
+    background refresh replaces them. Writes to an experiment drop its
+    entries; settle_seconds keeps results from being cached again until
+    the index has refreshed and the write is visible to searches.
+
+    Cached values are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 15.0,
+        stale_seconds: float = 60.0,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._settle_until: dict[str, float] = {}
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # The event loop only keeps weak references to tasks
+        self._refresh_tasks: set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    # --------------------------------------------------------------------------
+    # Core operations
+    # --------------------------------------------------------------------------
+
+    def lookup(self, key: str) -> tuple[Any, Optional[str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+
+            age = self._clock() - entry.stored_at
+            if age > self.ttl_seconds + self.stale_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None, None
+
+            self._entries.move_to_end(key)
+            if age <= self.ttl_seconds:
+                self.hits += 1
+                return entry.value, FRESH
+            self.stale_hits += 1
+            return entry.value, STALE
+
+    def generation(self, experiment_id: str) -> int:
+        with self._lock:
+            return self._generations.get(experiment_id, 0)
+
+    def store(self, key: str, experiment_id: str, value: Any, generation: int) -> None:
+        with self._lock:
+            # Results fetched before a write to the experiment are discarded
+            if self._generations.get(experiment_id, 0) != generation:
+                return
+            if self._clock() < self._settle_until.get(experiment_id, 0.0):
+                return
+
+            self._entries[key] = _Entry(value, experiment_id, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_experiment(self, experiment_id: str, settle_seconds: float = 0.0) -> None:
+        experiment_id = str(experiment_id)
+        with self._lock:
+            self._generations[experiment_id] = self._generations.get(experiment_id, 0) + 1
+            if settle_seconds > 0:
+                self._settle_until[experiment_id] = self._clock() + settle_seconds
+            for key in [k for k, e in self._entries.items() if e.experiment_id == experiment_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+            }
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    # --------------------------------------------------------------------------
+    # Read-through helpers
+    # --------------------------------------------------------------------------
+
+    def get_or_fetch(self, key: str, experiment_id: str, fetch: Callable[[], Any]) -> Any:
+        experiment_id = str(experiment_id)
+        value, state = self.lookup(key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            if self._claim_refresh(key):
+                self._refresh_executor().submit(self._refresh, key, experiment_id, fetch)
+            return value
+
+        generation = self.generation(experiment_id)
+        value = fetch()
+        self.store(key, experiment_id, value, generation)
+        return value
+
+    def _refresh_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-cache")
+            return self._executor
+
+    def _refresh(self, key: str, experiment_id: str, fetch: Callable[[], Any]) -> None:
+        try:
+            generation = self.generation(experiment_id)
+            self.store(key, experiment_id, fetch(), generation)
+        except Exception:
+            # Keep serving the stale entry; the next stale hit retries
+            pass
+        finally:
+            self._release_refresh(key)
+
+    async def aget_or_fetch(
+        self,
+        key: str,
+        experiment_id: str,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        experiment_id = str(experiment_id)
+        value, state = self.lookup(key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            if self._claim_refresh(key):
+                task = asyncio.ensure_future(self._arefresh(key, experiment_id, fetch))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+            return value
+
+        generation = self.generation(experiment_id)
+        value = await fetch()
+        self.store(key, experiment_id, value, generation)
+        return value
+
+    async def _arefresh(self, key: str, experiment_id: str, fetch: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            generation = self.generation(experiment_id)
+            self.store(key, experiment_id, await fetch(), generation)
+        except Exception:
+            pass
+        finally:
+            self._release_refresh(key)
@@ -0,0 +1,152 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.trace import StatusCode
+
+# Same trace id bits and bound as TraceIdRatioBased, so a ratio keeps the
+# same traces in every process that uses it
+_TRACE_ID_LIMIT = (1 << 64) - 1
+
+KEEP_ERROR = "error"
+KEEP_SLOW = "slow"
+KEEP_SAMPLED = "sampled"
+DROP = "dropped"
+
+
+class _PendingTrace:
+    __slots__ = ("spans", "error")
+
+    def __init__(self):
+        self.spans: list[ReadableSpan] = []
+        self.error = False
+
+
+class TailSamplingProcessor(SpanProcessor):
+    """
+    Buffers finished spans per trace and hands whole traces to `processor`
+    (usually a BatchSpanProcessor) once the local root span ends.
+
+    A trace is kept when any of its spans has status ERROR, when the root
+    took at least latency_threshold_ms, or otherwise with probability
+    keep_ratio, chosen from the trace id. Spans that end after their root
+    follow the decision already made for the trace.
+
+    At most max_buffered_spans are held. Past that the oldest open trace
+    is decided early on the spans seen so far, without the latency rule.
+    Decisions are remembered for the last max_decisions traces.
+    """
+
+    def __init__(
+        self,
+        processor: SpanProcessor,
+        keep_ratio: float = 0.1,
+        latency_threshold_ms: float = 1000.0,
+        max_buffered_spans: int = 100_000,
+        max_decisions: int = 100_000,
+    ):
+        if not 0.0 <= keep_ratio <= 1.0:
+            raise ValueError("keep_ratio must be between 0 and 1")
+        self.processor = processor
+        self.keep_ratio = keep_ratio
+        self.latency_threshold_ns = int(latency_threshold_ms * 1e6)
+        self.max_buffered_spans = max_buffered_spans
+        self.max_decisions = max_decisions
+        self._ratio_bound = round(keep_ratio * (_TRACE_ID_LIMIT + 1))
+
+        self._lock = threading.Lock()
+        self._pending: OrderedDict[int, _PendingTrace] = OrderedDict()
+        self._decisions: OrderedDict[int, bool] = OrderedDict()
+        self._buffered = 0
+
+        self.counts = {KEEP_ERROR: 0, KEEP_SLOW: 0, KEEP_SAMPLED: 0, DROP: 0, "evicted": 0}
+
+    # --------------------------------------------------------------------------
+    # Decisions
+    # --------------------------------------------------------------------------
+
+    def _decide(self, trace_id: int, pending: _PendingTrace, root: Optional[ReadableSpan]) -> bool:
+        if pending.error:
+            reason = KEEP_ERROR
+        elif root is not None and root.end_time - root.start_time >= self.latency_threshold_ns:
+            reason = KEEP_SLOW
+        elif (trace_id & _TRACE_ID_LIMIT) < self._ratio_bound:
+            reason = KEEP_SAMPLED
+        else:
+            reason = DROP
+        self.counts[reason] += 1
+
+        keep = reason != DROP
+        self._decisions[trace_id] = keep
+        if len(self._decisions) > self.max_decisions:
+            self._decisions.popitem(last=False)
+        return keep
+
+    def _evict(self) -> list[ReadableSpan]:
+        released: list[ReadableSpan] = []
+        while self._buffered > self.max_buffered_spans and self._pending:
+            trace_id, pending = self._pending.popitem(last=False)
+            self._buffered -= len(pending.spans)
+            self.counts["evicted"] += 1
+            if self._decide(trace_id, pending, root=None):
+                released.extend(pending.spans)
+        return released
+
+    # --------------------------------------------------------------------------
+    # SpanProcessor
+    # --------------------------------------------------------------------------
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        self.processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        is_root = span.parent is None or span.parent.is_remote
+
+        with self._lock:
+            decided = self._decisions.get(trace_id)
+            if decided is not None:
+                released = [span] if decided else []
+            else:
+                pending = self._pending.get(trace_id)
+                if pending is None:
+                    pending = self._pending[trace_id] = _PendingTrace()
+                pending.spans.append(span)
+                pending.error = pending.error or span.status.status_code is StatusCode.ERROR
+                self._buffered += 1
+
+                if is_root:
+                    del self._pending[trace_id]
+                    self._buffered -= len(pending.spans)
+                    released = pending.spans if self._decide(trace_id, pending, root=span) else []
+                else:
+                    released = self._evict()
+
+        for finished in released:
+            self.processor.on_end(finished)
+
+    def buffered_spans(self) -> int:
+        with self._lock:
+            return self._buffered
+
+    def _release_all(self) -> None:
+        with self._lock:
+            released = []
+            while self._pending:
+                trace_id, pending = self._pending.popitem(last=False)
+                if self._decide(trace_id, pending, root=None):
+                    released.extend(pending.spans)
+            self._buffered = 0
+        for finished in released:
+            self.processor.on_end(finished)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        # Open traces stay buffered; only decided spans are flushed
+        return self.processor.force_flush(timeout_millis)
+
+    def shutdown(self) -> None:
+        # Traces whose root never ended are decided on what was seen
+        self._release_all()
+        self.processor.shutdown()